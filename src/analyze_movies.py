@@ -1,5 +1,6 @@
 import pandas as pd
-from vectorizer import Vectorizer
+from vectorizer import Vectorizer, build_enriched_texts
+from embedding_cache import EmbeddingCache
 from recommendation_system import RecommendationSystem
 
 def load_data():
@@ -24,25 +25,24 @@ def analyze_movies():
     
     # 3. Criar vetores com contexto enriquecido
     vectorizer = Vectorizer()
-    vectorizer.create_bow_vectors(processed_texts)
-    vectorizer.create_tfidf_vectors(processed_texts)
+    vectorizer.fit_sparse(processed_texts)
     
     # Criar textos enriquecidos com gêneros para melhor busca
-    enriched_texts = []
-    for idx, row in df.iterrows():
-        synopsis = str(row.get('synopsis_content', '')).strip()
-        genres = str(row.get('genres', '')).strip()
-        
-        # Combinar sinopse com gêneros repetidos para dar mais peso
-        enriched_text = f"{synopsis}. Gêneros: {genres}. {genres}."
-        enriched_texts.append(enriched_text)
+    # (o cache evita recodificar sinopses que não mudaram)
+    enriched_texts = build_enriched_texts(df)
+    cache = EmbeddingCache("data/vectorized/sbert_cache.npz")
+    vectorizer.create_sbert_embeddings(enriched_texts, cache=cache)
+    print(f"Cache de embeddings: {cache.stats()}")
     
-    vectorizer.create_sbert_embeddings(enriched_texts)
+    # O link do JustWatch identifica o filme nas atualizações incrementais
+    vectorizer.set_doc_ids(df['link'])
     
     # 4. Sistema de recomendação
     recommender = RecommendationSystem(df, vectorizer)
     recommender.perform_clustering()
     recommender.create_pca_projection()
+    recommender.build_neighbor_graph("sbert")
+    recommender.build_bm25_index()
     
     # 5. Salvar resultados
     vectorizer.save_vectors("data/vectorized")
@@ -0,0 +1,230 @@
+"""Índices de vizinhos aproximados (ANN) para os embeddings SBERT normalizados."""
+
+import json
+import numpy as np
+from pathlib import Path
+
+from vectorizer import top_k_indices
+
+IVF_FILE = "sbert_ann_ivf.npz"
+HNSW_FILE = "sbert_ann_hnsw.bin"
+HNSW_PARAMS_FILE = "sbert_ann_hnsw.json"
+
+
+class IVFIndex:
+    """
+    Índice IVF (inverted file) com listas densas.
+
+    Os vetores são agrupados em `n_lists` células por um KMeans esférico e
+    cada busca só percorre as `nprobe` células mais próximas da query.
+    Aumentar `nprobe` melhora o recall às custas de latência.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, n_lists=None, nprobe=8, random_state=42):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.random_state = random_state
+        self.centroids = None
+        self.offsets = None
+        self.ids = None
+        self.vectors = None
+
+    def __len__(self):
+        return 0 if self.ids is None else len(self.ids)
+
+    def build(self, embeddings, sample_size=100_000, block_size=65536):
+        from sklearn.cluster import MiniBatchKMeans
+
+        n_docs = len(embeddings)
+        n_lists = self.n_lists or max(1, int(4 * np.sqrt(n_docs)))
+        n_lists = min(n_lists, n_docs)
+
+        # Treina o quantizador em uma amostra; a atribuição usa todos os vetores
+        rng = np.random.default_rng(self.random_state)
+        sample_rows = np.sort(rng.choice(n_docs, min(n_docs, max(sample_size, 40 * n_lists)), replace=False))
+        sample = np.asarray(embeddings[sample_rows], dtype=np.float32)
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_lists, batch_size=4096, n_init=1, random_state=self.random_state
+        )
+        kmeans.fit(sample)
+        centroids = kmeans.cluster_centers_.astype(np.float32)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        assignments = np.empty(n_docs, dtype=np.int64)
+        for start in range(0, n_docs, block_size):
+            block = np.asarray(embeddings[start:start + block_size], dtype=np.float32)
+            assignments[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+
+        order = np.argsort(assignments, kind="stable")
+        self.centroids = centroids
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))])
+        self.ids = order.astype(np.int64)
+        self.vectors = np.asarray(embeddings[order], dtype=np.float32)
+        self.n_lists = n_lists
+        return self
+
+    def search(self, query_vectors, top_k=5, nprobe=None):
+        """
+        Busca os vizinhos aproximados de cada query.
+
+        Returns:
+            Tupla (indices, scores) com shape (n_queries, top_k); posições sem
+            candidato ficam com índice -1 e score -inf.
+        """
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        indices = np.full((len(query_vectors), top_k), -1, dtype=np.int64)
+        scores = np.full((len(query_vectors), top_k), -np.inf, dtype=np.float32)
+
+        probes = np.argpartition(-(query_vectors @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        for row, (query, lists) in enumerate(zip(query_vectors, probes)):
+            positions = np.concatenate(
+                [np.arange(self.offsets[cell], self.offsets[cell + 1]) for cell in lists]
+            )
+            candidate_scores = self.vectors[positions] @ query
+            best = top_k_indices(candidate_scores, top_k)
+            indices[row, :len(best)] = self.ids[positions[best]]
+            scores[row, :len(best)] = candidate_scores[best]
+
+        return indices, scores
+
+    def save(self, output_dir):
+        np.savez(
+            Path(output_dir) / IVF_FILE,
+            centroids=self.centroids,
+            offsets=self.offsets,
+            ids=self.ids,
+            vectors=self.vectors,
+            nprobe=self.nprobe,
+        )
+
+    @classmethod
+    def load(cls, output_dir):
+        with np.load(Path(output_dir) / IVF_FILE) as data:
+            index = cls(n_lists=len(data["centroids"]), nprobe=int(data["nprobe"]))
+            index.centroids = data["centroids"]
+            index.offsets = data["offsets"]
+            index.ids = data["ids"]
+            index.vectors = data["vectors"]
+        return index
+
+
+class HNSWIndex:
+    """
+    Índice HNSW (grafo navegável), via biblioteca opcional `hnswlib`.
+
+    `ef_search` controla o compromisso entre recall e latência na busca;
+    `M` e `ef_construction` controlam a qualidade do grafo na construção.
+    """
+
+    kind = "hnsw"
+
+    def __init__(self, M=16, ef_construction=200, ef_search=64):
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.index = None
+        self.dim = None
+        self.n_docs = 0
+
+    def __len__(self):
+        return self.n_docs
+
+    def build(self, embeddings, block_size=65536):
+        hnswlib = _import_hnswlib()
+        self.n_docs, self.dim = embeddings.shape
+        self.index = hnswlib.Index(space="ip", dim=self.dim)
+        self.index.init_index(
+            max_elements=self.n_docs, ef_construction=self.ef_construction, M=self.M
+        )
+        for start in range(0, self.n_docs, block_size):
+            block = np.asarray(embeddings[start:start + block_size], dtype=np.float32)
+            self.index.add_items(block, np.arange(start, start + len(block)))
+        self.index.set_ef(self.ef_search)
+        return self
+
+    def search(self, query_vectors, top_k=5, ef_search=None):
+        k = min(top_k, self.n_docs)
+        self.index.set_ef(max(ef_search or self.ef_search, k))
+        labels, distances = self.index.knn_query(np.asarray(query_vectors, dtype=np.float32), k=k)
+
+        indices = np.full((len(labels), top_k), -1, dtype=np.int64)
+        scores = np.full((len(labels), top_k), -np.inf, dtype=np.float32)
+        indices[:, :k] = labels
+        # Em space="ip" a distância é 1 - produto interno
+        scores[:, :k] = 1.0 - distances
+        return indices, scores
+
+    def save(self, output_dir):
+        output_path = Path(output_dir)
+        self.index.save_index(str(output_path / HNSW_FILE))
+        with open(output_path / HNSW_PARAMS_FILE, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "M": self.M,
+                    "ef_construction": self.ef_construction,
+                    "ef_search": self.ef_search,
+                    "dim": self.dim,
+                    "n_docs": self.n_docs,
+                },
+                file,
+            )
+
+    @classmethod
+    def load(cls, output_dir):
+        hnswlib = _import_hnswlib()
+        output_path = Path(output_dir)
+        with open(output_path / HNSW_PARAMS_FILE, "r", encoding="utf-8") as file:
+            params = json.load(file)
+
+        index = cls(params["M"], params["ef_construction"], params["ef_search"])
+        index.dim = params["dim"]
+        index.n_docs = params["n_docs"]
+        index.index = hnswlib.Index(space="ip", dim=index.dim)
+        index.index.load_index(str(output_path / HNSW_FILE), max_elements=index.n_docs)
+        index.index.set_ef(index.ef_search)
+        return index
+
+
+def _import_hnswlib():
+    try:
+        import hnswlib
+    except ImportError as e:
+        raise ImportError("O índice HNSW requer o pacote 'hnswlib' (pip install hnswlib)") from e
+    return hnswlib
+
+
+ANN_INDEXES = {"ivf": IVFIndex, "hnsw": HNSWIndex}
+
+
+def build_ann_index(embeddings, kind="ivf", **params):
+    """
+    Constrói um índice ANN sobre os embeddings.
+
+    Args:
+        embeddings: Matriz (n, d) de vetores normalizados (pode ser np.memmap)
+        kind: 'ivf' (padrão, sem dependências extras) ou 'hnsw' (requer hnswlib)
+        **params: Parâmetros do índice (ex.: n_lists/nprobe ou M/ef_search)
+    """
+    if kind not in ANN_INDEXES:
+        raise ValueError(f"Índice '{kind}' não disponível")
+    return ANN_INDEXES[kind](**params).build(embeddings)
+
+
+def load_ann_index(output_dir):
+    """Carrega o índice salvo na pasta, ou retorna None se não houver."""
+    output_path = Path(output_dir)
+    if (output_path / HNSW_FILE).exists():
+        return HNSWIndex.load(output_path)
+    if (output_path / IVF_FILE).exists():
+        return IVFIndex.load(output_path)
+    return None
+
+
+def remove_ann_index(output_dir):
+    """Apaga os arquivos de índice salvos na pasta (ex.: índice desatualizado)."""
+    output_path = Path(output_dir)
+    for name in (IVF_FILE, HNSW_FILE, HNSW_PARAMS_FILE):
+        (output_path / name).unlink(missing_ok=True)
@@ -0,0 +1,174 @@
+"""Índice invertido BM25 sobre as sinopses stemizadas, com poda MaxScore.
+
+Cada termo guarda sua lista de postagem (documentos em ordem crescente) com o
+peso BM25 já calculado e o maior peso da lista. Na busca, os termos são
+processados do maior para o menor limite superior; quando a soma dos limites
+restantes não alcança o k-ésimo melhor score parcial, nenhum documento novo
+pode entrar no top-k e as listas restantes só são consultadas (busca binária)
+nos candidatos que ainda podem chegar lá.
+"""
+
+import ast
+import numpy as np
+from pathlib import Path
+
+from vectorizer import top_k_indices
+
+BM25_FILE = "bm25_index.npz"
+
+def _parse_tokens(value):
+    # synopsis_stemming foi salvo no CSV como str(list)
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    try:
+        parsed = ast.literal_eval(str(value))
+    except (ValueError, SyntaxError):
+        return str(value).split()
+    return list(parsed) if isinstance(parsed, (list, tuple)) else []
+
+
+def analyze(text):
+    """Limpa e stemiza a query como as sinopses foram processadas (RSLP, stopwords em português)."""
+    # Importado só na primeira query lexical (carrega o NLTK)
+    from text_preprocessing import clean_synopis, stemming
+
+    return stemming(clean_synopis(text))
+
+
+class BM25Index:
+    def __init__(self, vocabulary, offsets, doc_ids, impacts, n_docs, k1=1.2, b=0.75):
+        """
+        Listas de postagem em CSR: as do termo t ficam em [offsets[t], offsets[t + 1]).
+
+        Use `BM25Index.build` para criar a partir dos tokens.
+        """
+        self.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        self.terms = np.asarray(vocabulary, dtype=object)
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.n_docs = n_docs
+        self.k1 = k1
+        self.b = b
+        # Limite superior de cada termo (maior peso da lista)
+        self.max_impacts = np.maximum.reduceat(impacts, offsets[:-1]) if len(impacts) else np.zeros(0)
+
+    def __len__(self):
+        return self.n_docs
+
+    @classmethod
+    def build(cls, documents, k1=1.2, b=0.75):
+        """
+        Constrói o índice.
+
+        Args:
+            documents: Lista de documentos, cada um como lista de tokens ou str(list)
+                       (formato da coluna synopsis_stemming)
+            k1: Saturação da frequência do termo
+            b: Normalização pelo tamanho do documento
+        """
+        documents = [_parse_tokens(document) for document in documents]
+        vocabulary = {}
+        term_ids = np.fromiter(
+            (vocabulary.setdefault(token, len(vocabulary)) for document in documents for token in document),
+            dtype=np.int64,
+        )
+        lengths = np.array([len(document) for document in documents], dtype=np.float64)
+        rows = np.repeat(np.arange(len(documents), dtype=np.int64), lengths.astype(np.int64))
+
+        # Frequência de cada par (termo, documento), ordenado por termo e depois documento
+        pairs, tf = np.unique(term_ids * max(len(documents), 1) + rows, return_counts=True)
+        terms, doc_ids = np.divmod(pairs, max(len(documents), 1))
+
+        df = np.bincount(terms, minlength=len(vocabulary))
+        idf = np.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+        avgdl = lengths.mean() if len(lengths) and lengths.mean() > 0 else 1.0
+        norm = k1 * (1 - b + b * lengths[doc_ids] / avgdl)
+        impacts = (idf[terms] * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+        offsets = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+        return cls(list(vocabulary), offsets, doc_ids.astype(np.int32), impacts, len(documents), k1, b)
+
+    def _postings(self, term_id):
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.impacts[start:end]
+
+    def search(self, query, top_k=5, candidates=None):
+        """
+        Os `top_k` documentos com maior score BM25.
+
+        Args:
+            query: Texto (passa pelo `analyze`) ou lista de tokens já stemizados
+            top_k: Quantidade de resultados
+            candidates: Linhas permitidas (ex.: saída do MetadataIndex); None = todas
+
+        Returns:
+            Tupla (indices, scores), só com documentos de score > 0
+        """
+        tokens = analyze(query) if isinstance(query, str) else list(query)
+        term_ids, counts = np.unique(
+            [self.vocabulary[token] for token in tokens if token in self.vocabulary], return_counts=True
+        )
+        if len(term_ids) == 0 or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # Termos do maior para o menor limite superior
+        bounds = self.max_impacts[term_ids] * counts
+        order = np.argsort(-bounds, kind="stable")
+        term_ids, counts, bounds = term_ids[order], counts[order], bounds[order]
+        remaining = np.concatenate([np.cumsum(bounds[::-1])[::-1][1:], [0.0]])
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        allowed = None
+        if candidates is not None:
+            allowed = np.zeros(self.n_docs, dtype=bool)
+            allowed[candidates] = True
+
+        active = None  # Candidatos que ainda podem entrar no top-k (None = qualquer documento)
+        for term_id, count, rest in zip(term_ids, counts, remaining):
+            docs, impacts = self._postings(term_id)
+            if active is None:
+                if allowed is not None:
+                    keep = allowed[docs]
+                    docs, impacts = docs[keep], impacts[keep]
+                scores[docs] += impacts * count
+            else:
+                # Lista não essencial: só consulta os candidatos, por busca binária se forem poucos
+                if len(active) * 8 < len(docs):
+                    positions = np.minimum(np.searchsorted(docs, active), len(docs) - 1)
+                    hit = docs[positions] == active
+                    scores[active[hit]] += impacts[positions[hit]] * count
+                else:
+                    keep = np.isin(docs, active, assume_unique=True)
+                    scores[docs[keep]] += impacts[keep] * count
+
+            # Limiar: k-ésimo melhor score parcial (scores parciais só aumentam)
+            seen = np.flatnonzero(scores) if active is None else active
+            if len(seen) < top_k:
+                continue
+            threshold = np.partition(scores[seen], len(seen) - top_k)[len(seen) - top_k]
+            if rest < threshold:
+                # Documentos ainda sem score não alcançam o limiar; poda os candidatos
+                active = seen[scores[seen] + rest >= threshold]
+
+        hits = np.flatnonzero(scores) if active is None else active[scores[active] > 0]
+        best = top_k_indices(scores[hits], top_k)
+        return hits[best].astype(np.int64), scores[hits[best]]
+
+    def save(self, output_dir):
+        np.savez(
+            Path(output_dir) / BM25_FILE,
+            terms=self.terms.astype(str),
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            impacts=self.impacts,
+            params=np.array([self.n_docs, self.k1, self.b]),
+        )
+
+    @classmethod
+    def load(cls, output_dir):
+        with np.load(Path(output_dir) / BM25_FILE) as data:
+            n_docs, k1, b = data["params"]
+            return cls(
+                data["terms"].tolist(), data["offsets"], data["doc_ids"], data["impacts"], int(n_docs), k1, b
+            )
@@ -0,0 +1,189 @@
+"""Atribuição contínua de clusters para títulos novos, com detecção de drift.
+
+Títulos novos são atribuídos ao centróide mais próximo (a mesma regra do
+KMeans) e os centróides são atualizados como médias acumuladas. As métricas
+de drift comparam os títulos novos com o estado do último clustering completo;
+só quando passam dos limites é preciso rodar o clustering de novo.
+"""
+
+import numpy as np
+from pathlib import Path
+from scipy import sparse
+
+
+def _squared_norms(block):
+    if sparse.issparse(block):
+        return np.asarray(block.multiply(block).sum(axis=1)).ravel()
+    return np.einsum("ij,ij->i", block, block)
+
+
+def _rows(matrix, start, end):
+    block = matrix[start:end]
+    return block.tocsr() if sparse.issparse(block) else np.asarray(block, dtype=np.float64)
+
+
+class ClusterStream:
+    def __init__(self, centroids, counts, baseline_distance, distance_threshold=0.2,
+                 size_threshold=0.3, min_new=20, method="sbert"):
+        """
+        Args:
+            centroids: Centróides (k, d) do último clustering completo
+            counts: Quantidade de títulos em cada cluster
+            baseline_distance: Distância média ao centróide no clustering completo
+            distance_threshold: Aumento relativo da distância média dos títulos
+                                novos que indica drift (0.2 = 20%)
+            size_threshold: Distância de variação total entre a distribuição de
+                            tamanhos original e a dos títulos novos que indica drift
+            min_new: Títulos novos necessários antes de avaliar o drift
+        """
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.reference_centroids = self.centroids.copy()
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.reference_counts = self.counts.copy()
+        self.baseline_distance = float(baseline_distance)
+        self.distance_threshold = distance_threshold
+        self.size_threshold = size_threshold
+        self.min_new = min_new
+        self.method = method
+
+        # Cluster de cada linha já atribuída (clustering completo + títulos novos)
+        self.labels = None
+
+        # Estatísticas dos títulos atribuídos desde o último clustering
+        self.new_counts = np.zeros(len(self.centroids), dtype=np.int64)
+        self.new_distance_sum = 0.0
+
+    @classmethod
+    def from_clustering(cls, matrix, labels, centroids, method="sbert", block_size=65536, **params):
+        """Estado inicial a partir de um clustering completo (matriz densa, memmap ou CSR)."""
+        labels = np.asarray(labels)
+        centroids = np.asarray(centroids, dtype=np.float64)
+        stream = cls(centroids, np.bincount(labels, minlength=len(centroids)), 0.0, method=method, **params)
+        stream.labels = labels.astype(np.int64)
+
+        total = 0.0
+        for start in range(0, matrix.shape[0], block_size):
+            block = _rows(matrix, start, start + block_size)
+            total += stream._distances(block, labels[start:start + block_size]).sum()
+        stream.baseline_distance = float(total / max(matrix.shape[0], 1))
+        return stream
+
+    def _distances(self, block, labels):
+        # ||x - c||² = ||x||² - 2 x·c + ||c||², só para o centróide atribuído
+        centroids = self.centroids[labels]
+        dots = np.asarray(block.multiply(centroids).sum(axis=1)).ravel() if sparse.issparse(block) \
+            else np.einsum("ij,ij->i", block, centroids)
+        squared = _squared_norms(block) - 2 * dots + np.einsum("ij,ij->i", centroids, centroids)
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    def predict(self, matrix):
+        """Cluster mais próximo de cada linha, sem atualizar o estado."""
+        if not sparse.issparse(matrix):
+            matrix = np.asarray(matrix, dtype=np.float64)
+        half_norms = 0.5 * np.einsum("ij,ij->i", self.centroids, self.centroids)
+        return np.asarray(np.argmax(matrix @ self.centroids.T - half_norms, axis=1)).ravel()
+
+    def assign(self, matrix):
+        """
+        Atribui os títulos novos e atualiza centróides e estatísticas.
+
+        Args:
+            matrix: Representações (n, d) dos títulos novos
+
+        Returns:
+            Labels de cluster dos títulos
+        """
+        if not sparse.issparse(matrix):
+            matrix = np.asarray(matrix, dtype=np.float64).reshape(-1, self.centroids.shape[1])
+        labels = self.predict(matrix)
+        self.new_distance_sum += self._distances(matrix, labels).sum()
+
+        # Média acumulada: c <- (n * c + soma dos novos) / (n + novos)
+        batch_counts = np.bincount(labels, minlength=len(self.centroids))
+        if sparse.issparse(matrix):
+            one_hot = sparse.csr_matrix(
+                (np.ones(len(labels)), (labels, np.arange(len(labels)))),
+                shape=(len(self.centroids), len(labels)),
+            )
+            sums = np.asarray((one_hot @ matrix).todense())
+        else:
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, matrix)
+        updated = batch_counts > 0
+        total = self.counts + batch_counts
+        self.centroids[updated] = (
+            self.counts[updated, None] * self.centroids[updated] + sums[updated]
+        ) / total[updated, None]
+
+        self.counts = total
+        self.new_counts += batch_counts
+        if self.labels is not None:
+            self.labels = np.concatenate([self.labels, labels])
+        return labels
+
+    def drift(self):
+        """
+        Métricas de drift desde o último clustering completo.
+
+        Returns:
+            Dicionário com a distância média dos títulos novos e a original,
+            o deslocamento máximo de centróide, a assimetria de tamanhos
+            (maior cluster / tamanho médio) e `needs_reclustering`
+        """
+        n_new = int(self.new_counts.sum())
+        mean_distance = self.new_distance_sum / n_new if n_new else 0.0
+        distance_increase = mean_distance / self.baseline_distance - 1 if self.baseline_distance > 0 and n_new else 0.0
+
+        reference_share = self.reference_counts / max(self.reference_counts.sum(), 1)
+        new_share = self.new_counts / max(n_new, 1)
+        size_divergence = 0.5 * float(np.abs(new_share - reference_share).sum()) if n_new else 0.0
+
+        centroid_shift = float(np.linalg.norm(self.centroids - self.reference_centroids, axis=1).max())
+        size_skew = float(self.counts.max() / max(self.counts.mean(), 1e-12))
+
+        needs_reclustering = n_new >= self.min_new and (
+            distance_increase > self.distance_threshold or size_divergence > self.size_threshold
+        )
+        return {
+            "new_titles": n_new,
+            "mean_distance": float(mean_distance),
+            "baseline_distance": self.baseline_distance,
+            "distance_increase": float(distance_increase),
+            "size_divergence": size_divergence,
+            "size_skew": size_skew,
+            "reference_size_skew": float(self.reference_counts.max() / max(self.reference_counts.mean(), 1e-12)),
+            "centroid_shift": centroid_shift,
+            "needs_reclustering": bool(needs_reclustering),
+        }
+
+    def save(self, output_dir):
+        np.savez(
+            Path(output_dir) / f"cluster_stream_{self.method}.npz",
+            centroids=self.centroids,
+            reference_centroids=self.reference_centroids,
+            counts=self.counts,
+            reference_counts=self.reference_counts,
+            new_counts=self.new_counts,
+            labels=self.labels if self.labels is not None else np.empty(0, dtype=np.int64),
+            stats=np.array([
+                self.baseline_distance, self.new_distance_sum,
+                self.distance_threshold, self.size_threshold, self.min_new,
+            ]),
+        )
+
+    @classmethod
+    def load(cls, output_dir, method="sbert"):
+        with np.load(Path(output_dir) / f"cluster_stream_{method}.npz") as data:
+            baseline, new_distance_sum, distance_threshold, size_threshold, min_new = data["stats"]
+            stream = cls(
+                data["reference_centroids"], data["reference_counts"], baseline,
+                distance_threshold, size_threshold, int(min_new), method,
+            )
+            stream.centroids = data["centroids"]
+            stream.counts = data["counts"]
+            stream.new_counts = data["new_counts"]
+            stream.new_distance_sum = float(new_distance_sum)
+            # Arquivos antigos não guardavam os labels
+            if "labels" in data.files and len(data["labels"]) == stream.counts.sum():
+                stream.labels = data["labels"]
+        return stream
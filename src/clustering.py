@@ -0,0 +1,111 @@
+"""Clustering escalável: MiniBatchKMeans em blocos e escolha automática de k."""
+
+import numpy as np
+from scipy import sparse
+
+
+def _rows(matrix, rows):
+    # Bloco de linhas em memória (float32 para densos/memmap, CSR para esparsos)
+    block = matrix[rows]
+    if sparse.issparse(block):
+        return block.tocsr().astype(np.float32)
+    return np.asarray(block, dtype=np.float32)
+
+
+def _score_candidate(sample, n_clusters, scoring, random_state):
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.metrics import silhouette_score
+
+    model = MiniBatchKMeans(n_clusters=n_clusters, n_init=3, random_state=random_state)
+    labels = model.fit_predict(sample)
+    if scoring == "silhouette":
+        return silhouette_score(sample, labels, metric="cosine")
+    return model.inertia_
+
+
+def select_n_clusters(
+    matrix,
+    candidates=range(2, 21),
+    sample_size: int = 5000,
+    scoring: str = "silhouette",
+    n_jobs: int = -1,
+    random_state: int = 42,
+) -> tuple:
+    """
+    Escolhe o número de clusters avaliando os candidatos em uma amostra.
+
+    Args:
+        matrix: Matriz densa, np.memmap ou CSR
+        candidates: Valores de k a testar
+        sample_size: Tamanho da amostra usada na avaliação
+        scoring: 'silhouette' (maior é melhor) ou 'elbow' (cotovelo da inércia)
+        n_jobs: Processos avaliando candidatos em paralelo (-1 usa todos os núcleos)
+
+    Returns:
+        Tupla (k escolhido, {k: score})
+    """
+    from joblib import Parallel, delayed
+
+    n_docs = matrix.shape[0]
+    rng = np.random.default_rng(random_state)
+    sample = _rows(matrix, np.sort(rng.choice(n_docs, min(sample_size, n_docs), replace=False)))
+    candidates = [k for k in candidates if 2 <= k < sample.shape[0]]
+    if not candidates:
+        raise ValueError("Nenhum número de clusters válido para o tamanho da amostra")
+
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_score_candidate)(sample, k, scoring, random_state) for k in candidates
+    )
+    scores = dict(zip(candidates, scores))
+
+    if scoring == "silhouette":
+        return max(scores, key=scores.get), scores
+
+    # Cotovelo: ponto da curva de inércia mais distante da reta entre as extremidades
+    ks = np.array(candidates, dtype=float)
+    inertia = np.array([scores[k] for k in candidates], dtype=float)
+    ks_norm = (ks - ks[0]) / max(ks[-1] - ks[0], 1e-12)
+    inertia_norm = (inertia - inertia[-1]) / max(inertia[0] - inertia[-1], 1e-12)
+    distance = np.abs(ks_norm + inertia_norm - 1) / np.sqrt(2)
+    return candidates[int(np.argmax(distance))], scores
+
+
+def minibatch_kmeans(
+    matrix,
+    n_clusters: int,
+    batch_size: int = 4096,
+    n_epochs: int = 10,
+    random_state: int = 42,
+) -> tuple:
+    """
+    Treina um MiniBatchKMeans lendo a matriz em blocos de linhas.
+
+    Só um bloco de `batch_size` linhas fica em memória por vez, então a
+    entrada pode ser um np.memmap ou uma matriz esparsa maior que a RAM.
+
+    Returns:
+        Tupla (modelo treinado, labels de cada linha)
+    """
+    from sklearn.cluster import MiniBatchKMeans
+
+    n_docs = matrix.shape[0]
+    if n_docs < n_clusters:
+        raise ValueError(f"Poucos documentos ({n_docs}) para {n_clusters} clusters")
+    batch_size = max(batch_size, n_clusters)
+    model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=random_state)
+
+    rng = np.random.default_rng(random_state)
+    starts = np.arange(0, n_docs, batch_size)
+    for _ in range(n_epochs):
+        for start in rng.permutation(starts):
+            block = _rows(matrix, slice(start, start + batch_size))
+            # O primeiro partial_fit inicializa os centróides e precisa de >= k linhas
+            if not hasattr(model, "cluster_centers_") and block.shape[0] < n_clusters:
+                continue
+            model.partial_fit(block)
+
+    labels = np.empty(n_docs, dtype=np.int32)
+    for start in starts:
+        labels[start:start + batch_size] = model.predict(_rows(matrix, slice(start, start + batch_size)))
+
+    return model, labels
@@ -0,0 +1,235 @@
+"""Caches de embeddings SBERT: persistente (catálogo) e em memória (queries)."""
+
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+
+# Intervalo mínimo (s) para atualizar o último uso de uma entrada; leituras
+# dentro dele não marcam o cache como alterado, então não regravam o arquivo
+TOUCH_INTERVAL = 86400
+
+
+class EmbeddingCache:
+    def __init__(self, path, max_entries=200_000, max_age_days=90):
+        """
+        Cache em disco de embeddings, indexado pelo hash de (modelo, texto).
+
+        Apenas textos novos ou alterados precisam ser codificados; o restante
+        é lido do arquivo `.npz`.
+
+        Args:
+            path: Caminho do arquivo `.npz` do cache
+            max_entries: Número máximo de entradas (remove as menos usadas)
+            max_age_days: Entradas não usadas há mais dias que isso são removidas
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+
+        self._keys = []
+        self._rows = {}
+        self._vectors = None
+        self._last_used = np.empty(0, dtype=np.float64)
+        self._dirty = False
+
+        if self.path.exists():
+            self._load()
+
+    @staticmethod
+    def make_key(model_name, text):
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _load(self):
+        with np.load(self.path, allow_pickle=False) as data:
+            self._keys = data["keys"].tolist()
+            self._vectors = data["vectors"]
+            self._last_used = data["last_used"]
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+
+    def get_many(self, model_name, texts):
+        """
+        Busca os embeddings de vários textos de uma vez.
+
+        Returns:
+            Tupla (embeddings, missing): matriz com as linhas encontradas
+            preenchidas (ou None se o cache estiver vazio) e a lista de
+            posições que precisam ser codificadas.
+        """
+        rows = np.array(
+            [self._rows.get(self.make_key(model_name, text), -1) for text in texts],
+            dtype=np.int64,
+        )
+        found = rows >= 0
+        n_hits = int(found.sum())
+        self.hits += n_hits
+        self.misses += len(texts) - n_hits
+        missing = np.flatnonzero(~found).tolist()
+
+        if self._vectors is None:
+            return None, missing
+
+        embeddings = np.empty((len(texts), self._vectors.shape[1]), dtype=self._vectors.dtype)
+        if n_hits:
+            embeddings[found] = self._vectors[rows[found]]
+            now = time.time()
+            stale = rows[found][self._last_used[rows[found]] < now - TOUCH_INTERVAL]
+            if len(stale):
+                self._last_used[stale] = now
+                self._dirty = True
+
+        return embeddings, missing
+
+    def put_many(self, model_name, texts, embeddings):
+        """Adiciona (ou substitui) os embeddings dos textos informados."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self._vectors is None:
+            self._vectors = np.empty((0, embeddings.shape[1]), dtype=np.float32)
+
+        new_keys = []
+        new_rows = []
+        for text, vector in zip(texts, embeddings):
+            key = self.make_key(model_name, text)
+            row = self._rows.get(key)
+            if row is None:
+                self._rows[key] = len(self._keys) + len(new_keys)
+                new_keys.append(key)
+                new_rows.append(vector)
+            elif row < len(self._keys):
+                self._vectors[row] = vector
+                self._last_used[row] = time.time()
+
+        if new_keys:
+            self._keys.extend(new_keys)
+            self._vectors = np.vstack([self._vectors, np.asarray(new_rows)])
+            self._last_used = np.concatenate(
+                [self._last_used, np.full(len(new_keys), time.time())]
+            )
+        self._dirty = True
+
+    def evict(self):
+        """
+        Remove entradas antigas (mais de `max_age_days` sem uso) e, se o cache
+        ainda passar de `max_entries`, as menos usadas recentemente.
+
+        Returns:
+            Número de entradas removidas
+        """
+        n_entries = len(self._keys)
+        keep = np.ones(n_entries, dtype=bool)
+
+        if self.max_age_days is not None:
+            keep &= self._last_used >= time.time() - self.max_age_days * 86400
+
+        if self.max_entries is not None and keep.sum() > self.max_entries:
+            candidates = np.flatnonzero(keep)
+            order = np.argsort(self._last_used[candidates])
+            keep[candidates[order[: len(candidates) - self.max_entries]]] = False
+
+        removed = n_entries - int(keep.sum())
+        if removed:
+            self._keys = [key for key, kept in zip(self._keys, keep) if kept]
+            self._vectors = self._vectors[keep]
+            self._last_used = self._last_used[keep]
+            self._rows = {key: row for row, key in enumerate(self._keys)}
+            self._dirty = True
+
+        return removed
+
+    def save(self):
+        """Aplica a política de remoção e grava o cache se houve alterações."""
+        self.evict()
+        if not self._dirty or self._vectors is None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp_path,
+            keys=np.array(self._keys, dtype="U64"),
+            vectors=self._vectors,
+            last_used=self._last_used,
+        )
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._keys),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_size=1024, ttl_seconds=3600):
+        """
+        Cache LRU em memória dos embeddings de queries.
+
+        Args:
+            max_size: Número máximo de queries guardadas
+            ttl_seconds: Tempo de vida de cada entrada (None para não expirar)
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query):
+        # Mesma query com espaços ou composição unicode diferentes vira a mesma chave
+        return " ".join(unicodedata.normalize("NFC", query).split())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, query):
+        key = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None:
+                if time.monotonic() - entry[0] > self.ttl_seconds:
+                    del self._entries[key]
+                    entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, query, vector):
+        key = self.normalize(query)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
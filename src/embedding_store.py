@@ -0,0 +1,91 @@
+"""Armazenamento binário de embeddings lido via memória mapeada (np.memmap)."""
+
+import os
+import struct
+import numpy as np
+from pathlib import Path
+
+# Formato: cabeçalho fixo de 64 bytes seguido de um bloco contíguo (linhas x dim)
+#   magic (8s) | versão (I) | dtype (I: 0=float32, 1=float16) | linhas (Q) | dim (Q)
+MAGIC = b"PLNEMB\0\0"
+VERSION = 1
+HEADER_SIZE = 64
+_HEADER_FORMAT = "<8sIIQQ"
+_DTYPES = {0: np.float32, 1: np.float16}
+_DTYPE_CODES = {np.dtype(dtype): code for code, dtype in _DTYPES.items()}
+
+
+def _read_header(path):
+    with open(path, "rb") as file:
+        raw = file.read(HEADER_SIZE)
+
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"Arquivo '{path}' não é um armazenamento de embeddings válido")
+
+    magic, version, dtype_code, n_rows, dim = struct.unpack_from(_HEADER_FORMAT, raw)
+    if magic != MAGIC:
+        raise ValueError(f"Arquivo '{path}' não é um armazenamento de embeddings válido")
+    if version != VERSION or dtype_code not in _DTYPES:
+        raise ValueError(f"Versão ou tipo não suportado em '{path}'")
+
+    return np.dtype(_DTYPES[dtype_code]), (n_rows, dim)
+
+
+def create_embedding_store(path, n_rows, dim, dtype="float32"):
+    """
+    Cria um armazenamento vazio e o devolve aberto para escrita.
+
+    Útil para escrever os embeddings direto no arquivo, sem cópia intermediária.
+
+    Args:
+        path: Caminho do arquivo (normalmente `sbert_embeddings.emb`)
+        n_rows: Número de documentos
+        dim: Dimensão dos embeddings
+        dtype: 'float32' ou 'float16'
+
+    Returns:
+        np.memmap gravável com shape (n_rows, dim)
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in _DTYPE_CODES:
+        raise ValueError(f"Tipo '{dtype}' não suportado (use float32 ou float16)")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = struct.pack(_HEADER_FORMAT, MAGIC, VERSION, _DTYPE_CODES[dtype], n_rows, dim)
+    with open(path, "wb") as file:
+        file.write(header.ljust(HEADER_SIZE, b"\0"))
+        file.truncate(HEADER_SIZE + n_rows * dim * dtype.itemsize)
+
+    return np.memmap(path, dtype=dtype, mode="r+", offset=HEADER_SIZE, shape=(n_rows, dim))
+
+
+def save_embedding_store(path, embeddings, dtype="float32"):
+    """
+    Grava uma matriz de embeddings no formato do armazenamento.
+
+    A escrita vai para um arquivo temporário que depois substitui o destino, então
+    `embeddings` pode ser o próprio memmap aberto a partir de `path`.
+    """
+    path = Path(path)
+    embeddings = np.asarray(embeddings)
+    tmp_path = path.with_suffix(".tmp" + path.suffix)
+    store = create_embedding_store(tmp_path, embeddings.shape[0], embeddings.shape[1], dtype)
+    store[:] = embeddings
+    store.flush()
+    del store
+    os.replace(tmp_path, path)
+
+
+def open_embedding_store(path, mode="r"):
+    """
+    Abre o armazenamento sem copiar os dados para a memória do processo.
+
+    Com mode='r' (padrão) o mapeamento é somente leitura, então vários
+    processos compartilham as mesmas páginas do cache do sistema operacional.
+
+    Returns:
+        np.memmap com shape (linhas, dim)
+    """
+    dtype, shape = _read_header(path)
+    return np.memmap(path, dtype=dtype, mode=mode, offset=HEADER_SIZE, shape=shape)
@@ -0,0 +1,144 @@
+"""Download concorrente de páginas: sessão HTTP com pool, limite por host e novas tentativas.
+
+As requisições usam uma única `requests.Session` (conexões keep-alive
+reaproveitadas) executada em threads pelo asyncio. `concurrency` workers
+consomem os links de uma fila limitada, cada host respeita um intervalo
+mínimo entre requisições (o horário é reservado só no momento do envio) e
+falhas temporárias (erros de conexão, timeout, 429 e 5xx) são repetidas pelo
+próprio worker, com espera exponencial. Links que continuam falhando são
+registrados, sem interromper o restante.
+"""
+
+import asyncio
+import random
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status que valem nova tentativa
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    def __init__(self, requests_per_second: float):
+        """
+        Garante no máximo `requests_per_second` requisições por segundo em cada host.
+
+        Args:
+            requests_per_second: Limite por host; 0 ou None desativa o limite
+        """
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        # Reserva o próximo horário livre do host e espera até ele
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def create_session(pool_size: int, headers: dict = None) -> requests.Session:
+    """Sessão com pool de conexões do tamanho da concorrência."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+async def _fetch_one(session, url, limiter, retries, backoff, timeout):
+    """Baixa uma página; retorna (conteúdo, None) ou (None, descrição do erro)."""
+    error = None
+    for attempt in range(retries + 1):
+        await limiter.wait(url)
+        try:
+            response = await asyncio.to_thread(session.get, url, timeout=timeout)
+        except requests.RequestException as e:
+            response, error = None, f"{type(e).__name__}: {e}"
+
+        if response is not None:
+            if response.ok:
+                return response.content, None
+            error = f"HTTP {response.status_code}"
+            if response.status_code not in RETRY_STATUS:
+                break
+
+        if attempt < retries:
+            delay = backoff * 2 ** attempt * (1 + random.random())
+            retry_after = response.headers.get("Retry-After") if response is not None else None
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            await asyncio.sleep(delay)
+
+    return None, error
+
+
+async def fetch_pages(
+    urls,
+    handle,
+    concurrency: int = 8,
+    requests_per_host: float = 4.0,
+    retries: int = 3,
+    backoff: float = 0.5,
+    timeout: float = 15.0,
+    headers: dict = None,
+):
+    """
+    Baixa as páginas concorrentemente e processa cada uma assim que chega.
+
+    Args:
+        urls: Lista de URLs
+        handle: Função `handle(url, content)` executada em uma thread para cada
+                página baixada (ex.: parsing do HTML); o retorno vai para `results`
+        concurrency: Workers (máximo de requisições simultâneas)
+        requests_per_host: Requisições por segundo permitidas em cada host
+        retries: Novas tentativas para falhas temporárias
+        backoff: Espera base (s) da primeira nova tentativa; dobra a cada tentativa
+        timeout: Timeout (s) de cada requisição
+        headers: Cabeçalhos HTTP da sessão
+
+    Returns:
+        Tupla (results, failures): `results` na ordem de `urls` (None onde
+        falhou) e `failures` como lista de {'link', 'error'}
+    """
+    urls = list(urls)
+    limiter = HostRateLimiter(requests_per_host)
+    results = [None] * len(urls)
+    failures = []
+    # Fila limitada: os links entram aos poucos, sem uma tarefa por link
+    queue = asyncio.Queue(maxsize=2 * concurrency)
+
+    with create_session(concurrency, headers) as session:
+
+        async def produce():
+            for item in enumerate(urls):
+                await queue.put(item)
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        async def work():
+            while (item := await queue.get()) is not None:
+                position, url = item
+                content, error = await _fetch_one(session, url, limiter, retries, backoff, timeout)
+                if error is not None:
+                    failures.append({"link": url, "error": error})
+                    continue
+                try:
+                    results[position] = await asyncio.to_thread(handle, url, content)
+                except Exception as e:
+                    failures.append({"link": url, "error": f"{type(e).__name__}: {e}"})
+
+        await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+
+    return results, failures
@@ -1,14 +1,12 @@
+import asyncio
 from bs4 import BeautifulSoup
 import pandas as pd
-import requests
-import string
 # import nltk
-from nltk.stem import RSLPStemmer 
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 import os
 
+from fetcher import fetch_pages
+from text_preprocessing import clean_synopis, lemma, stemming
+
 
 # precisa rodar apenas uma vez, para baixar as dependências
 # depois da primeira vez, pode comentar.
@@ -25,163 +23,150 @@ HEADERS = {
 }
 
 
-def get_movies_info():
-    """
-    Pega informações dos filmes listados no arquivo movies_links, dentro da pasta data.
-
-    """
-    df = pd.DataFrame(columns=[
-        "link","title", "year", "streamings", "synopsis_content", "synopsis_lemming",
-        "synopsis_stemming", "just_watch_rating", "rotten_tomatoes_rating", 
-        "imdb_ratings", "genres", "movie_duration", "age_classification"
-    ])
-
-    with open('data/movies_links.csv', 'r') as file:
-        # percorre os links dentro do arquivo
-        for link in file:
-
-            link = link.strip()
-
-            # acessa os links
-            response = requests.get(link, headers=HEADERS)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, "html.parser")
-
-            # pega os nomes dos streamings
-            streamings_tags = soup.find_all("img", class_="provider-icon wide icon")
-            streamings_names = [img.get("alt") for img in streamings_tags]
-
-            # pega a sinopse
-            div_synopsis = soup.find("div", id="synopsis")
-            try:
-                synopsis_content = div_synopsis.find("p").get_text(strip=True)
-                # filtra as palavras e, a partir dela, faz o stemming e lemming
-                clean_words = clean_synopis(synopsis_content)
-                synopsis_lemming = lemma(clean_words)
-                synopsis_stemming = stemming(clean_words)
-
-                # pega as avaliações
-                # caso não existam avaliações, deixa como não avaliado
-                ratings_rotten_jw = soup.find_all("div", class_="jw-scoring-listing__rating--group jw-scoring-listing__rating--no-link")
-                rating_just_watch = "NAOAVALIADO"
-                rating_rotten_tomatoes = "NAOAVALIADO"
-                rating_imdb = "NAOAVALIADO"
-
-                # caso existam valores, dai salva na variavel
-                if len(ratings_rotten_jw) > 1:
-                    rating_just_watch = ratings_rotten_jw[0].get_text(strip=True)
-                    rating_rotten_tomatoes = ratings_rotten_jw[1].get_text(strip=True)
-                
-                # mesma coisa para o rating do imdb, caso exista, é salvo na variável
-                rating_imdb = soup.find("div", class_="jw-scoring-listing__rating--group jw-scoring-listing__rating--link")
-                if rating_imdb:
-                    rating_imdb = rating_imdb.text.strip()
-                
-                # pega o titulo, caso não encontre, fica como vazio
-                title = soup.find_all("h1")
-                if title:
-                    title = title[0].get_text(strip=True)
-                else:
-                    title = "VAZIO"
-
-                # pega o ano
-                year = soup.find("span", class_="release-year").get_text(strip=True)
-        
-                # pega informa~]oes diversas
-                infos = soup.find_all("div", class_="poster-detail-infos__value")
-
-                # pega os generos do titulo
-                genres = infos[4].get_text(strip=True).split(',')
-                genres = [genre.strip() for genre in genres]
-
-                # pega a duração do filme
-                movie_duration = infos[6].get_text(strip=True)
-
-                # classificação de idade livre por padrão 
-                age_classification = 'L'
-                
-                # caso exista essa classificação, é salva
-                if len(infos) >= 9:
-                    age_classification = infos[8].get_text(strip=True)            
-                
-                # adiciona no dataframe
-                df = pd.concat([df, pd.DataFrame([{
-                    "link": link,
-                    "title": title,
-                    "year": year,
-                    "streamings": streamings_names,
-                    "synopsis_content": synopsis_content,
-                    "synopsis_lemming": synopsis_lemming,
-                    "synopsis_stemming": synopsis_stemming,
-                    "just_watch_rating": rating_just_watch,
-                    "rotten_tomatoes_rating": rating_rotten_tomatoes,
-                    "imdb_ratings": rating_imdb,
-                    "genres": genres,
-                    "movie_duration": movie_duration,
-                    "age_classification": age_classification
-                }])], ignore_index=True)
-            except AttributeError:
-                print(f"pulando filme %s", link)
-                continue
+COLUMNS = [
+    "link","title", "year", "streamings", "synopsis_content", "synopsis_lemming",
+    "synopsis_stemming", "just_watch_rating", "rotten_tomatoes_rating", 
+    "imdb_ratings", "genres", "movie_duration", "age_classification"
+]
 
-    # no final, salva num csv
 
-    os.makedirs("data", exist_ok=True)
-    df.to_csv("data/movies_info.csv", index=False, encoding="utf-8", sep=";")
-
-def clean_synopis(sinopse):
-    # Verificar se a sinopse não é None ou vazia
-    if not sinopse or pd.isna(sinopse):
-        return ""
-    
-    # Converter para minúsculas
-    sinopse = sinopse.lower()
-    
-    # Remover pontuações
-    sinopse = sinopse.translate(str.maketrans('', '', string.punctuation))
-    
-    # Tokenizar (dividir em palavras)
-    palavras = word_tokenize(sinopse, language='portuguese')
-    
-    # Carregar stopwords em português
-    stop_words = set(stopwords.words('portuguese'))
-    
-    # Remover stopwords
-    palavras_filtradas = [palavra for palavra in palavras if palavra not in stop_words]
-    
-    return palavras_filtradas 
-
-
-def lemma(palavras_filtradas: list[str]) -> list:
+def parse_movie_page(link, content):
     """
-    Feito o processo de lematização.
+    Extrai as informações de um filme do HTML da sua página.
 
     Args:
-        palavras_filtradas (list[str]): palavras com a remoção dos stopwords e pontuação.  
+        link: Link do filme
+        content: HTML da página (bytes ou str)
+
+    Returns:
+        Dicionário com as colunas de movies_info.csv, ou None se a página não
+        tiver sinopse ou os campos esperados
     """
-    lemmatizer = WordNetLemmatizer()
+    soup = BeautifulSoup(content, "html.parser")
+
+    # pega os nomes dos streamings
+    streamings_tags = soup.find_all("img", class_="provider-icon wide icon")
+    streamings_names = [img.get("alt") for img in streamings_tags]
+
+    # pega a sinopse
+    div_synopsis = soup.find("div", id="synopsis")
+    try:
+        synopsis_content = div_synopsis.find("p").get_text(strip=True)
+        # filtra as palavras e, a partir dela, faz o stemming e lemming
+        clean_words = clean_synopis(synopsis_content)
+        synopsis_lemming = lemma(clean_words)
+        synopsis_stemming = stemming(clean_words)
+
+        # pega as avaliações
+        # caso não existam avaliações, deixa como não avaliado
+        ratings_rotten_jw = soup.find_all("div", class_="jw-scoring-listing__rating--group jw-scoring-listing__rating--no-link")
+        rating_just_watch = "NAOAVALIADO"
+        rating_rotten_tomatoes = "NAOAVALIADO"
+        rating_imdb = "NAOAVALIADO"
+
+        # caso existam valores, dai salva na variavel
+        if len(ratings_rotten_jw) > 1:
+            rating_just_watch = ratings_rotten_jw[0].get_text(strip=True)
+            rating_rotten_tomatoes = ratings_rotten_jw[1].get_text(strip=True)
+        
+        # mesma coisa para o rating do imdb, caso exista, é salvo na variável
+        rating_imdb = soup.find("div", class_="jw-scoring-listing__rating--group jw-scoring-listing__rating--link")
+        if rating_imdb:
+            rating_imdb = rating_imdb.text.strip()
+        
+        # pega o titulo, caso não encontre, fica como vazio
+        title = soup.find_all("h1")
+        if title:
+            title = title[0].get_text(strip=True)
+        else:
+            title = "VAZIO"
 
-    lemmas = [lemmatizer.lemmatize(palavra) for palavra in palavras_filtradas]
+        # pega o ano
+        year = soup.find("span", class_="release-year").get_text(strip=True)
 
-    palavras_finais = [
-        palavra for palavra in lemmas 
-        if len(palavra) > 2 and palavra.isalpha()  # só letras
-    ]
-    
-    return palavras_finais 
+        # pega informa~]oes diversas
+        infos = soup.find_all("div", class_="poster-detail-infos__value")
+
+        # pega os generos do titulo
+        genres = infos[4].get_text(strip=True).split(',')
+        genres = [genre.strip() for genre in genres]
 
+        # pega a duração do filme
+        movie_duration = infos[6].get_text(strip=True)
 
-def stemming(palavras_filtradas: list[str]) -> list:
+        # classificação de idade livre por padrão 
+        age_classification = 'L'
+        
+        # caso exista essa classificação, é salva
+        if len(infos) >= 9:
+            age_classification = infos[8].get_text(strip=True)            
+    except AttributeError:
+        print(f"pulando filme {link}")
+        return None
+
+    return {
+        "link": link,
+        "title": title,
+        "year": year,
+        "streamings": streamings_names,
+        "synopsis_content": synopsis_content,
+        "synopsis_lemming": synopsis_lemming,
+        "synopsis_stemming": synopsis_stemming,
+        "just_watch_rating": rating_just_watch,
+        "rotten_tomatoes_rating": rating_rotten_tomatoes,
+        "imdb_ratings": rating_imdb,
+        "genres": genres,
+        "movie_duration": movie_duration,
+        "age_classification": age_classification
+    }
+
+
+def get_movies_info(links_path="data/movies_links.csv", output_path="data/movies_info.csv",
+                    concurrency=8, requests_per_host=4.0, retries=3, timeout=15.0):
     """
-    Feito o processo de stematização.
+    Pega informações dos filmes listados no arquivo movies_links, dentro da pasta data.
+
+    As páginas são baixadas concorrentemente (ver fetcher.py). Links que
+    falharem mesmo após as novas tentativas são salvos em
+    `<output>_failures.csv` em vez de interromper a coleta.
 
     Args:
-        palavras_filtradas (list[str]): palavras com a remoção dos stopwords e pontuação.  
+        links_path: Arquivo com um link por linha
+        output_path: CSV de saída
+        concurrency: Requisições simultâneas
+        requests_per_host: Requisições por segundo no site
+        retries: Novas tentativas para falhas temporárias (timeout, 429, 5xx)
+        timeout: Timeout (s) de cada requisição
     """
-    stemmer = RSLPStemmer()
+    with open(links_path, 'r') as file:
+        links = [link.strip() for link in file if link.strip()]
+
+    results, failures = asyncio.run(fetch_pages(
+        links, parse_movie_page, concurrency=concurrency, requests_per_host=requests_per_host,
+        retries=retries, timeout=timeout, headers=HEADERS,
+    ))
+
+    # páginas baixadas mas sem os campos esperados também ficam registradas
+    failed = {failure["link"] for failure in failures}
+    failures += [
+        {"link": link, "error": "página sem sinopse ou campos esperados"}
+        for link, row in zip(links, results) if row is None and link not in failed
+    ]
+
+    # as linhas são juntadas uma única vez no final, na ordem dos links
+    df = pd.DataFrame([row for row in results if row is not None], columns=COLUMNS)
+
+    # no final, salva num csv
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    df.to_csv(output_path, index=False, encoding="utf-8", sep=";")
 
-    palavras_stemmed = [stemmer.stem(palavra) for palavra in palavras_filtradas]
+    if failures:
+        failures_path = os.path.splitext(output_path)[0] + "_failures.csv"
+        pd.DataFrame(failures).to_csv(failures_path, index=False, encoding="utf-8", sep=";")
+        print(f"{len(failures)} links falharam (detalhes em {failures_path})")
 
-    return palavras_stemmed
+    print(f"{len(df)} filmes salvos em {output_path}")
+    return df
 
-get_movies_info()
+if __name__ == "__main__":
+    get_movies_info()
@@ -0,0 +1,80 @@
+"""Relatório do tempo de importação dos módulos do projeto (via python -X importtime)."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+MODULES = [
+    "embedding_store",
+    "embedding_cache",
+    "vectorizer",
+    "ann_index",
+    "knn",
+    "recommendation_system",
+    "search_interface",
+]
+
+# Acima disso o módulo é marcado no relatório
+IMPORT_BUDGET_MS = 1000
+
+
+def measure_import_time(module: str, top_n: int = 3) -> tuple:
+    """
+    Importa o módulo em um processo novo e mede o tempo de importação.
+
+    Args:
+        module: Nome do módulo (dentro de src/)
+        top_n: Quantidade de dependências mais pesadas a retornar
+
+    Returns:
+        Tupla (total_ms, [(dependência, ms), ...])
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).parent,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # Linhas no formato "import time: self [us] | cumulative | <indentação>pacote"
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((level, name.strip(), int(cumulative) / 1000))
+
+    # O módulo é a última entrada de nível mais alto; suas dependências diretas
+    # são as entradas um nível abaixo que aparecem logo antes dele
+    top_level, _, total_ms = entries[-1]
+    dependencies = []
+    for level, name, ms in reversed(entries[:-1]):
+        if level == top_level:
+            break
+        if level == top_level + 1:
+            dependencies.append((name, ms))
+    dependencies.sort(key=lambda item: item[1], reverse=True)
+
+    return total_ms, dependencies[:top_n]
+
+
+def main():
+    print(f"{'módulo':<24}{'tempo (ms)':>12}   dependências mais pesadas")
+    print("-" * 80)
+    for module in MODULES:
+        try:
+            total_ms, dependencies = measure_import_time(module)
+        except RuntimeError as e:
+            print(f"{module:<24}{'erro':>12}   {e}")
+            continue
+
+        flag = "  <-- acima do limite" if total_ms > IMPORT_BUDGET_MS else ""
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in dependencies)
+        print(f"{module:<24}{total_ms:>12.1f}   {heaviest}{flag}")
+
+
+if __name__ == "__main__":
+    main()
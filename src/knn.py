@@ -1,25 +1,228 @@
 import numpy as np
 import pandas as pd
 import os
-from sklearn.model_selection import train_test_split
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.metrics import classification_report, confusion_matrix
+from typing import TYPE_CHECKING
 
-from vectorizer import Vectorizer
+from embedding_store import open_embedding_store
+
+# sklearn e o Vectorizer (torch) são importados só quando usados, para que
+# classificar com vetores já salvos não pague o custo de importação
+if TYPE_CHECKING:
+    from sklearn.neighbors import KNeighborsClassifier
+
+
+def load_embeddings(vectorized_dir: str):
+    """
+    Anexa os embeddings SBERT somente leitura (memória mapeada).
+
+    Usa o armazenamento `sbert_embeddings.emb` quando existir e, caso
+    contrário, o `sbert_embeddings.npy` gerado por versões anteriores.
+    """
+    store_path = os.path.join(vectorized_dir, "sbert_embeddings.emb")
+    if os.path.exists(store_path):
+        return open_embedding_store(store_path)
+    return np.load(os.path.join(vectorized_dir, "sbert_embeddings.npy"), mmap_mode="r")
+
+
+def load_representation(vectorized_dir: str, method: str = "sbert"):
+    """
+    Carrega uma representação salva pelo Vectorizer.save_vectors.
+
+    Args:
+        vectorized_dir: Pasta data/vectorized
+        method: 'sbert' (memória mapeada), 'tfidf' ou 'bow' (CSR .npz)
+    """
+    if method == "sbert":
+        return load_embeddings(vectorized_dir)
+    if method in ("bow", "tfidf"):
+        from scipy import sparse
+
+        return sparse.load_npz(os.path.join(vectorized_dir, f"{method}_matrix.npz")).tocsr()
+    raise ValueError(f"Método '{method}' não disponível")
+
+
+def sweep_k(x_train, y_train, x_test, y_test, k_values=range(1, 21)) -> pd.DataFrame:
+    """
+    Avalia o KNN (cosseno, votação uniforme) para vários k com uma única busca de vizinhos.
+
+    O ranking teste x treino é calculado uma vez até max(k_values); os votos
+    de todos os k saem de uma soma acumulada dos rótulos em one-hot.
+
+    Returns:
+        DataFrame com k, acurácia e tempos (busca única e votação de cada k)
+    """
+    import time
+    from similarity_engine import top_k_per_row
+
+    k_values = sorted(k for k in k_values if 1 <= k <= x_train.shape[0])
+    y_train = np.asarray(y_train)
+    y_test = np.asarray(y_test)
+    classes = np.unique(y_train)
+
+    start = time.perf_counter()
+    neighbors, _ = top_k_per_row(x_test, k_values[-1], y=x_train)
+    search_time = time.perf_counter() - start
+
+    # votes[i, j, c] = vizinhos da classe c entre os j + 1 mais próximos de i
+    neighbor_labels = np.searchsorted(classes, y_train[neighbors])
+    one_hot = np.zeros(neighbor_labels.shape + (len(classes),), dtype=np.int32)
+    np.put_along_axis(one_hot, neighbor_labels[..., None], 1, axis=2)
+    votes = np.cumsum(one_hot, axis=1)
+
+    rows = []
+    for k in k_values:
+        start = time.perf_counter()
+        # Empate: argmax fica com a menor classe, como o KNeighborsClassifier
+        predictions = classes[np.argmax(votes[:, k - 1], axis=1)]
+        vote_time = time.perf_counter() - start
+        rows.append({
+            "k": k,
+            "acuracia": float(np.mean(predictions == y_test)),
+            "busca_ms": search_time * 1000,
+            "votacao_ms": vote_time * 1000,
+            "ms_por_query": (search_time + vote_time) * 1000 / max(len(y_test), 1),
+        })
+    return pd.DataFrame(rows)
+
+
+def _evaluate_method(method, vectorized_dir, k_values, test_size, random_state):
+    # Executado em um processo separado por representação
+    from sklearn.model_selection import train_test_split
+
+    x = load_representation(vectorized_dir, method)
+    y = pd.read_csv(os.path.join(vectorized_dir, "cluster_labels.csv"), sep=";")["cluster"].to_numpy()
+    train_rows, test_rows = (
+        np.sort(rows)
+        for rows in train_test_split(np.arange(len(y)), test_size=test_size, random_state=random_state)
+    )
+    result = sweep_k(x[train_rows], y[train_rows], x[test_rows], y[test_rows], k_values)
+    result.insert(0, "metodo", method)
+    return result
+
+
+def evaluate_representations(
+    methods=("bow", "tfidf", "sbert"),
+    k_values=range(1, 21),
+    test_size: float = 0.2,
+    random_state: int = 42,
+    base_path: str = None,
+    n_jobs: int = 3,
+) -> pd.DataFrame:
+    """
+    Compara BoW, TF-IDF e SBERT no KNN, cada representação em um processo.
+
+    Todas usam a mesma divisão treino/teste. Representações sem arquivo
+    salvo são puladas com um aviso.
+
+    Returns:
+        DataFrame com uma linha por (método, k)
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    vectorized_dir = os.path.join(base_path, "data", "vectorized") if base_path else "data/vectorized"
+    args = (vectorized_dir, list(k_values), test_size, random_state)
+
+    results = []
+    if n_jobs <= 1:
+        for method in methods:
+            try:
+                results.append(_evaluate_method(method, *args))
+            except (OSError, ValueError) as e:
+                print(f"Aviso: {method} não avaliado: {e}")
+    else:
+        with ProcessPoolExecutor(min(n_jobs, len(methods))) as executor:
+            futures = {method: executor.submit(_evaluate_method, method, *args) for method in methods}
+            for method, future in futures.items():
+                try:
+                    results.append(future.result())
+                except (OSError, ValueError) as e:
+                    print(f"Aviso: {method} não avaliado: {e}")
+
+    if not results:
+        raise ValueError("Nenhuma representação disponível para avaliação")
+    report = pd.concat(results, ignore_index=True)
+
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    best = report.loc[report.groupby("metodo")["acuracia"].idxmax()]
+    print("\nMelhor k por representação:")
+    print(best[["metodo", "k", "acuracia", "ms_por_query"]].to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    return report
+
+
+def _is_normalized(x, sample_size: int = 1000, tol: float = 1e-3) -> bool:
+    """Verifica, em uma amostra de linhas, se os vetores têm norma 1."""
+    from scipy import sparse
+
+    sample = x[:sample_size]
+    if sparse.issparse(sample):
+        norms = np.sqrt(np.asarray(sample.multiply(sample).sum(axis=1)).ravel())
+    else:
+        norms = np.linalg.norm(np.asarray(sample, dtype=np.float32), axis=1)
+    return len(norms) > 0 and bool(np.all(np.abs(norms - 1) < tol))
+
+
+def _normalize_rows(x):
+    from sklearn.preprocessing import normalize
+
+    return normalize(x)
+
+
+def _vote(neighbor_labels, n_classes: int, valid=None):
+    # Votação uniforme; empate fica com a menor classe, como no KNeighborsClassifier
+    counts = np.zeros((len(neighbor_labels), n_classes), dtype=np.int32)
+    rows = np.repeat(np.arange(len(neighbor_labels)), neighbor_labels.shape[1])
+    weights = np.ones(neighbor_labels.size, dtype=np.int32) if valid is None else valid.ravel().astype(np.int32)
+    np.add.at(counts, (rows, np.maximum(neighbor_labels, 0).ravel()), weights)
+    return np.argmax(counts, axis=1)
+
+
+BACKENDS = ("auto", "sklearn", "brute", "ball_tree", "kd_tree", "ann")
 
 
 class KNN:
-    def __init__(self, k_neighbors: int = 5, metric: str = "cosine"):
+    def __init__(
+        self,
+        k_neighbors: int = 5,
+        metric: str = "cosine",
+        backend: str = "sklearn",
+        n_jobs: int = 1,
+        batch_size: int = 4096,
+        ann_params: dict = None,
+    ):
         """
         Inicializa o modelo KNN.
 
+        Em vetores de norma 1 (como os embeddings SBERT), o ranking por
+        cosseno é o mesmo do produto interno e da distância euclidiana, o
+        que permite usar produto de matrizes (BLAS), árvores ou um índice ANN.
+
         Args:
             k_neighbors: Número de vizinhos para o KNN
             metric: Métrica de distância (padrão: 'cosine')
+            backend: 'sklearn' (padrão, KNeighborsClassifier com `metric`),
+                     'brute' (produto interno em blocos), 'ball_tree'/'kd_tree'
+                     (euclidiana nos vetores normalizados), 'ann' (índice IVF
+                     aproximado) ou 'auto' (brute se a entrada já for
+                     normalizada e a métrica for cosseno, senão sklearn)
+            n_jobs: Threads processando lotes de `predict` em paralelo
+            batch_size: Linhas por lote em `predict`
+            ann_params: Parâmetros do IVFIndex (ex.: {'nprobe': 16})
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend '{backend}' não disponível")
         self.k_neighbors = k_neighbors
         self.metric = metric
+        self.backend = backend
+        self.n_jobs = n_jobs
+        self.batch_size = batch_size
+        self.ann_params = ann_params or {}
         self.model = None
+        # Backends brute/ann: matriz de treino normalizada ou IVFIndex
+        self.index = None
+        self.classes = None
+        self.y_train = None
+        self.fitted_backend = None
+        self._normalize_queries = False
 
     def load_data(self, base_path: str = None) -> tuple:
         """
@@ -32,16 +235,12 @@ class KNN:
             Tupla (x, y) com embeddings e labels de cluster
         """
         if base_path:
-            x_path = os.path.join(
-                base_path, "data", "vectorized", "sbert_embeddings.npy"
-            )
-            y_path = os.path.join(base_path, "data", "vectorized", "cluster_labels.csv")
+            vectorized_dir = os.path.join(base_path, "data", "vectorized")
         else:
-            x_path = "data/vectorized/sbert_embeddings.npy"
-            y_path = "data/vectorized/cluster_labels.csv"
+            vectorized_dir = "data/vectorized"
 
-        x = np.load(x_path)
-        y = pd.read_csv(y_path, sep=";")["cluster"]
+        x = load_embeddings(vectorized_dir)
+        y = pd.read_csv(os.path.join(vectorized_dir, "cluster_labels.csv"), sep=";")["cluster"]
 
         return x, y
 
@@ -53,32 +252,91 @@ class KNN:
             x: Features (embeddings)
             y: Labels (clusters)
         """
-        self.model = KNeighborsClassifier(
-            n_neighbors=self.k_neighbors, metric=self.metric
-        )
-        self.model.fit(x, y)
+        from sklearn.neighbors import KNeighborsClassifier
+
+        backend = self.backend
+        normalized = self.metric == "cosine" and _is_normalized(x)
+        if backend == "auto":
+            backend = "brute" if normalized else "sklearn"
+        self.fitted_backend = backend
+        self.model = None
+        self.index = None
+
+        if backend == "sklearn":
+            self.model = KNeighborsClassifier(
+                n_neighbors=self.k_neighbors, metric=self.metric
+            )
+            self.model.fit(x, y)
+            return
+
+        if self.metric not in ("cosine", "euclidean"):
+            raise ValueError(f"Backend '{backend}' só suporta as métricas 'cosine' e 'euclidean'")
+        if backend in ("brute", "ann") and self.metric != "cosine":
+            raise ValueError(f"O backend '{backend}' usa produto interno e requer metric='cosine'")
+
+        # Cosseno vira produto interno / euclidiana sobre vetores de norma 1
+        self._normalize_queries = self.metric == "cosine"
+        if self._normalize_queries and not normalized:
+            x = _normalize_rows(x)
+
+        self.classes, labels = np.unique(np.asarray(y), return_inverse=True)
+        self.y_train = labels
+
+        if backend in ("ball_tree", "kd_tree"):
+            self.model = KNeighborsClassifier(
+                n_neighbors=self.k_neighbors, algorithm=backend, metric="euclidean"
+            )
+            self.model.fit(x, y)
+        elif backend == "ann":
+            from ann_index import IVFIndex
+
+            self.index = IVFIndex(**self.ann_params).build(np.asarray(x, dtype=np.float32))
+        else:
+            # Convertido uma vez aqui (ex.: armazenamento float16), e não a cada predict
+            from scipy import sparse
+
+            self.index = x.astype(np.float32).tocsr() if sparse.issparse(x) else np.asarray(x, dtype=np.float32)
 
     def train_and_evaluate(
-        self, test_size: float = 0.2, random_state: int = 42
-    ) -> KNeighborsClassifier:
+        self, test_size: float = 0.2, random_state: int = 42, k_values=None,
+        validation_size: float = 0.2,
+    ) -> "KNeighborsClassifier":
         """
         Carrega dados, treina o modelo e avalia sua performance.
 
         Args:
             test_size: Porcentagem dos dados para teste
             random_state: Seed para reprodutibilidade
+            k_values: Se informado, avalia todos esses k com uma única busca
+                      de vizinhos (`sweep_k`) em uma divisão de validação do
+                      treino e usa o de maior acurácia; o teste só avalia o k escolhido
+            validation_size: Porcentagem do treino separada para escolher k
 
         Returns:
-            Modelo KNN treinado
+            Modelo KNeighborsClassifier treinado (None nos backends brute/ann,
+            que não usam o sklearn)
         """
+        from sklearn.metrics import classification_report
+        from sklearn.model_selection import train_test_split
+
         x, y = self.load_data()
         x_train, x_test, y_train, y_test = train_test_split(
             x, y, test_size=test_size, random_state=random_state
         )
 
+        if k_values is not None and self.metric == "cosine":
+            # k escolhido sem olhar o teste, para o relatório final não ficar otimista
+            x_fit, x_val, y_fit, y_val = train_test_split(
+                x_train, y_train, test_size=validation_size, random_state=random_state
+            )
+            sweep = sweep_k(x_fit, y_fit, x_val, y_val, k_values)
+            print(sweep.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+            self.k_neighbors = int(sweep.loc[sweep["acuracia"].idxmax(), "k"])
+            print(f"k escolhido: {self.k_neighbors}")
+
         self.train(x_train, y_train)
 
-        y_pred = self.model.predict(x_test)
+        y_pred = self.predict(x_test)
 
         print("Veracidade entre os dados reais e os preditos:")
         print(classification_report(y_test, y_pred))
@@ -96,77 +354,233 @@ class KNN:
         x, y = self.load_data(base_path)
         self.train(x, y)
 
+    def _predict_batch(self, batch):
+        backend = self.fitted_backend
+        if backend == "sklearn":
+            return self.model.predict(batch)
+        if self._normalize_queries and not _is_normalized(batch):
+            batch = _normalize_rows(batch)
+        if backend in ("ball_tree", "kd_tree"):
+            return self.model.predict(batch)
+
+        if backend == "ann":
+            indices, _ = self.index.search(np.asarray(batch, dtype=np.float32), self.k_neighbors)
+            valid = indices >= 0
+            return self.classes[_vote(self.y_train[np.maximum(indices, 0)], len(self.classes), valid)]
+
+        # Treino e queries com norma 1: cosseno = produto interno, em blocos (BLAS)
+        from similarity_engine import top_k_per_row
+
+        indices, _ = top_k_per_row(batch, self.k_neighbors, y=self.index, normalized=True)
+        return self.classes[_vote(self.y_train[indices], len(self.classes))]
+
     def predict(self, embeddings):
         """
         Faz predições usando o modelo treinado.
 
+        As linhas são processadas em lotes de `batch_size`; com `n_jobs > 1`
+        os lotes rodam em threads (o produto de matrizes e as buscas nas
+        árvores liberam o GIL).
+
         Args:
             embeddings: Embeddings para classificar
 
         Returns:
             Predições de cluster
         """
-        if self.model is None:
+        if self.fitted_backend is None:
             raise ValueError(
                 "Modelo não foi treinado. Chame train() ou train_and_evaluate() primeiro."
             )
-        return self.model.predict(embeddings)
+        from scipy import sparse
+
+        if not sparse.issparse(embeddings):
+            embeddings = np.asarray(embeddings)
+        n_rows = embeddings.shape[0]
+        if n_rows <= self.batch_size:
+            return self._predict_batch(embeddings)
+
+        starts = range(0, n_rows, self.batch_size)
+        batches = (embeddings[start:start + self.batch_size] for start in starts)
+        if self.n_jobs <= 1:
+            return np.concatenate([self._predict_batch(batch) for batch in batches])
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(self.n_jobs) as executor:
+            return np.concatenate(list(executor.map(self._predict_batch, batches)))
 
     def get_model(self):
         """
         Retorna o modelo sklearn subjacente.
 
         Returns:
-            Modelo KNeighborsClassifier
+            Modelo KNeighborsClassifier (None nos backends brute/ann)
         """
         return self.model
 
 
-def load_knn_data() -> list:
-    """
-    como já foi feito em 'vectorize', vamos reutilizar.
-    lá, ele utilizou o KMeans, o que significa que fez grupos pela semelhança entre filmes.
-    então, será utilizado os filmes e seus os grupos.
-    """
-    x = np.load("data/vectorized/sbert_embeddings.npy")  # pega o arquivo gerado
-    y = pd.read_csv("data/vectorized/cluster_labels.csv", sep=";")["cluster"]
+class NearestCentroid:
+    def __init__(self, centroids=None):
+        """
+        Classificador pelo centróide mais próximo (sem etapa de treino).
 
-    return x, y
+        Reproduz a atribuição do KMeans: argmin ||x - c||² equivale a
+        argmax (x·c - ||c||²/2), um produto (n, d) x (d, k) por lote.
 
+        Args:
+            centroids: Matriz (k, d) com os centróides salvos pelo clustering
+        """
+        self.centroids = None
+        self.half_norms = None
+        if centroids is not None:
+            self.set_centroids(centroids)
+
+    def set_centroids(self, centroids):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.half_norms = 0.5 * np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+    @staticmethod
+    def centroids_path(base_path: str = None, method: str = "sbert") -> str:
+        vectorized_dir = os.path.join(base_path, "data", "vectorized") if base_path else "data/vectorized"
+        return os.path.join(vectorized_dir, f"cluster_centroids_{method}.npy")
+
+    def load(self, base_path: str = None, method: str = "sbert"):
+        """
+        Carrega os centróides salvos por RecommendationSystem.save_results.
+
+        Args:
+            base_path: Caminho base do projeto. Se None, usa caminho relativo.
+            method: Representação usada no clustering
+        """
+        self.set_centroids(np.load(self.centroids_path(base_path, method)))
+        return self
+
+    def fit(self, x, y):
+        """
+        Calcula os centróides como a média de cada cluster (quando não há centróides salvos).
 
-def train_and_avaluate(k_neighbors: int = 5):
+        Args:
+            x: Features (embeddings)
+            y: Labels (clusters 0..k-1)
+        """
+        y = np.asarray(y)
+        x = np.asarray(x, dtype=np.float32)
+        sums = np.zeros((y.max() + 1, x.shape[1]), dtype=np.float64)
+        np.add.at(sums, y, x)
+        counts = np.maximum(np.bincount(y, minlength=len(sums)), 1)
+        self.set_centroids(sums / counts[:, None])
+        return self
+
+    def predict(self, embeddings):
+        """
+        Cluster de cada embedding.
+
+        Args:
+            embeddings: Embeddings para classificar, shape (n, d)
+
+        Returns:
+            Predições de cluster
+        """
+        if self.centroids is None:
+            raise ValueError("Centróides não carregados. Chame load() ou fit() primeiro.")
+        scores = np.asarray(embeddings, dtype=np.float32) @ self.centroids.T - self.half_norms
+        return np.argmax(scores, axis=1)
+
+
+def compare_classifiers(
+    k_neighbors: int = 5, test_size: float = 0.2, random_state: int = 42, base_path: str = None
+) -> pd.DataFrame:
     """
-    Chama a função que separa os dados x e y a partir do arquivo.
-    Treina os dados de entrada. Predita e avalia.
+    Compara o KNN com o classificador por centróide: acerto, concordância e latência.
+
+    Os centróides salvos são usados se existirem; caso contrário, são
+    calculados com os dados de treino.
+
+    Returns:
+        DataFrame com uma linha por classificador
     """
-    x, y = load_knn_data()
+    import time
+    from sklearn.model_selection import train_test_split
+
+    knn = KNN(k_neighbors=k_neighbors)
+    x, y = knn.load_data(base_path)
     x_train, x_test, y_train, y_test = train_test_split(
-        x, y, test_size=0.2, random_state=42
+        np.asarray(x), np.asarray(y), test_size=test_size, random_state=random_state
     )
 
-    # modelo (usa a similaridade do cosseno)
-    knn = KNeighborsClassifier(n_neighbors=k_neighbors, metric="cosine")
+    start = time.perf_counter()
+    knn.train(x_train, y_train)
+    knn_setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    centroid = NearestCentroid()
+    if os.path.exists(NearestCentroid.centroids_path(base_path)):
+        centroid.load(base_path)
+    else:
+        centroid.fit(x_train, y_train)
+    centroid_setup = time.perf_counter() - start
+
+    rows = []
+    predictions = {}
+    for name, classifier, setup in (("knn", knn, knn_setup), ("centroide", centroid, centroid_setup)):
+        start = time.perf_counter()
+        predictions[name] = classifier.predict(x_test)
+        batch = time.perf_counter() - start
+
+        # Latência de uma query isolada (caso da interface)
+        single = []
+        for row in x_test[:100]:
+            start = time.perf_counter()
+            classifier.predict(row.reshape(1, -1))
+            single.append(time.perf_counter() - start)
+
+        rows.append({
+            "classificador": name,
+            "acuracia": float(np.mean(predictions[name] == y_test)),
+            "preparo_ms": setup * 1000,
+            "lote_ms": batch * 1000,
+            "query_p50_ms": float(np.percentile(single, 50)) * 1000,
+            "query_p99_ms": float(np.percentile(single, 99)) * 1000,
+        })
+
+    report = pd.DataFrame(rows)
+    agreement = float(np.mean(predictions["knn"] == predictions["centroide"]))
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    print(f"Concordância entre KNN e centróide: {agreement:.1%}")
+    return report
 
-    # treina
-    knn.fit(x_train, y_train)
 
-    # predita
-    y_pred = knn.predict(x_test)
+def load_knn_data() -> list:
+    """
+    como já foi feito em 'vectorize', vamos reutilizar.
+    lá, ele utilizou o KMeans, o que significa que fez grupos pela semelhança entre filmes.
+    então, será utilizado os filmes e seus os grupos.
+    """
+    return KNN().load_data()
+
 
-    print("Veracidade entre os dados reais e os preditos:")
-    print(classification_report(y_test, y_pred))
+def train_and_avaluate(k_neighbors: int = 5, k_values=None):
+    """
+    Chama a função que separa os dados x e y a partir do arquivo.
+    Treina os dados de entrada. Predita e avalia.
 
-    return knn
+    Mantida por compatibilidade; usa KNN.train_and_evaluate.
+    """
+    return KNN(k_neighbors=k_neighbors).train_and_evaluate(k_values=k_values)
 
 
 if __name__ == "__main__":
+    from vectorizer import Vectorizer
+
     # Testar usando a nova classe KNN
     knn_classifier = KNN(k_neighbors=5)
     knn = knn_classifier.train_and_evaluate()
+    compare_classifiers()
+    evaluate_representations()
 
     # testar o modelo com um filme novo
     vectorizer = Vectorizer()
-    vectorizer.create_sbert_embeddings([""])
 
     new_synopsys_1 = (
         "Mariazinha comprou um jogo de tabuleiro e foi levada para outro mundo."
@@ -184,7 +598,7 @@ if __name__ == "__main__":
     """
     new_synopsys = [new_synopsys_1, new_synopsys_2, new_synopsys_3]
 
-    new_embedding = vectorizer.sbert_model.encode(
+    new_embedding = vectorizer.get_sbert_model().encode(
         new_synopsys, normalize_embeddings=True
     )
     predict = knn_classifier.predict(new_embedding)
@@ -0,0 +1,159 @@
+"""Índices de metadados (gênero, plataforma, classificação etária, ano) para pré-filtrar buscas.
+
+Os campos categóricos viram listas de postagem (valor -> linhas ordenadas) e os
+numéricos um array ordenado consultado com busca binária. Um filtro como
+"genre=Terror AND platform=Netflix AND year>=2020" resolve para o conjunto de
+linhas candidatas antes de qualquer cálculo de similaridade.
+"""
+
+import ast
+import re
+import numpy as np
+
+# Nome usado nos filtros -> coluna do movies_info.csv
+LIST_FIELDS = {"genre": "genres", "platform": "streamings"}
+NUMERIC_FIELDS = {"year": "year", "age": "age_classification"}
+
+_CLAUSE = re.compile(r"^\s*(\w+)\s*(>=|<=|!=|=|>|<)\s*(.+?)\s*$")
+_OR = re.compile(r"\s+OR\s+", re.IGNORECASE)
+_AND = re.compile(r"\s+AND\s+", re.IGNORECASE)
+
+
+def _parse_list(value):
+    # As listas foram salvas no CSV como str(list), ex.: "['Terror', 'Drama']"
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    try:
+        parsed = ast.literal_eval(str(value))
+    except (ValueError, SyntaxError):
+        return []
+    return list(parsed) if isinstance(parsed, (list, tuple)) else []
+
+
+def _parse_year(value):
+    match = re.search(r"\d{4}", str(value))
+    return float(match.group()) if match else np.nan
+
+
+def _parse_age(value):
+    # "L" (livre) vale 0; valores fora do padrão (ex.: país raspado por engano) ficam sem idade
+    value = str(value).strip()
+    if value.upper() == "L":
+        return 0.0
+    return float(value) if value.isdigit() else np.nan
+
+
+def _normalize(value):
+    return str(value).strip().casefold()
+
+
+class MetadataIndex:
+    def __init__(self, df):
+        """
+        Constrói os índices a partir do DataFrame de filmes.
+
+        Args:
+            df: DataFrame com as colunas genres, streamings, year e age_classification
+        """
+        self.n_rows = len(df)
+        self.postings = {}
+        for field, column in LIST_FIELDS.items():
+            rows_by_value = {}
+            if column in df:
+                for row, values in enumerate(df[column]):
+                    for value in set(map(_normalize, _parse_list(values))):
+                        rows_by_value.setdefault(value, []).append(row)
+            self.postings[field] = {
+                value: np.array(rows, dtype=np.int64) for value, rows in rows_by_value.items()
+            }
+
+        # Campos numéricos: valores ordenados + linhas correspondentes (NaN fica de fora)
+        parsers = {"year": _parse_year, "age": _parse_age}
+        self.sorted_values = {}
+        self.sorted_rows = {}
+        for field, column in NUMERIC_FIELDS.items():
+            values = np.array(
+                [parsers[field](value) for value in df[column]] if column in df else [np.nan] * self.n_rows,
+                dtype=np.float64,
+            )
+            rows = np.flatnonzero(~np.isnan(values))
+            order = np.argsort(values[rows], kind="stable")
+            self.sorted_values[field] = values[rows][order]
+            self.sorted_rows[field] = rows[order]
+
+    def __len__(self):
+        return self.n_rows
+
+    def _all_rows(self):
+        return np.arange(self.n_rows, dtype=np.int64)
+
+    def _numeric_rows(self, field, op, value):
+        if op == "!=":
+            return np.setdiff1d(self._all_rows(), self._numeric_rows(field, "=", value), assume_unique=True)
+        values, rows = self.sorted_values[field], self.sorted_rows[field]
+        if op == "=":
+            start, end = np.searchsorted(values, value, "left"), np.searchsorted(values, value, "right")
+        elif op == ">=":
+            start, end = np.searchsorted(values, value, "left"), len(values)
+        elif op == ">":
+            start, end = np.searchsorted(values, value, "right"), len(values)
+        elif op == "<=":
+            start, end = 0, np.searchsorted(values, value, "right")
+        else:
+            start, end = 0, np.searchsorted(values, value, "left")
+        return np.sort(rows[start:end])
+
+    def _clause_rows(self, clause):
+        match = _CLAUSE.match(clause)
+        if match is None:
+            raise ValueError(f"Filtro inválido: '{clause}'")
+        field, op, value = match.group(1).lower(), match.group(2), match.group(3).strip("'\"")
+
+        if field in LIST_FIELDS:
+            if op not in ("=", "!="):
+                raise ValueError(f"Operador '{op}' não suportado para '{field}'")
+            rows = self.postings[field].get(_normalize(value), np.empty(0, dtype=np.int64))
+            if op == "!=":
+                return np.setdiff1d(self._all_rows(), rows, assume_unique=True)
+            return rows
+
+        if field in NUMERIC_FIELDS:
+            number = _parse_age(value) if field == "age" else _parse_year(value)
+            if np.isnan(number):
+                raise ValueError(f"Valor inválido para '{field}': '{value}'")
+            return self._numeric_rows(field, op, number)
+
+        raise ValueError(f"Campo '{field}' não disponível para filtro")
+
+    def filter(self, expression):
+        """
+        Linhas que satisfazem a expressão, em ordem crescente.
+
+        A expressão combina cláusulas `campo op valor` com AND e OR (AND tem
+        precedência). Campos: genre, platform (=, !=), year, age (=, !=, <,
+        <=, >, >=). Valores de texto não diferenciam maiúsculas.
+
+        Args:
+            expression: Ex.: "genre=Terror AND platform=Netflix AND year>=2020"
+
+        Returns:
+            np.ndarray int64 com as linhas candidatas (todas, se a expressão for vazia)
+        """
+        if expression is None or not expression.strip():
+            return self._all_rows()
+
+        result = np.empty(0, dtype=np.int64)
+        for conjunction in _OR.split(expression.strip()):
+            # Interseção começando pela lista mais curta
+            clauses = sorted((self._clause_rows(clause) for clause in _AND.split(conjunction)), key=len)
+            rows = clauses[0]
+            for other in clauses[1:]:
+                if len(rows) == 0:
+                    break
+                rows = np.intersect1d(rows, other, assume_unique=True)
+            result = np.union1d(result, rows)
+        return result.astype(np.int64)
+
+    def values_of(self, field):
+        """Valores distintos de um campo categórico (para montar filtros na interface)."""
+        return sorted(self.postings[field])
@@ -0,0 +1,63 @@
+"""Metadados dos filmes em arrays numpy somente leitura, para montar resultados sem pandas.
+
+Os campos exibidos nos resultados (título, ano, gêneros, duração, sinopse já
+truncada...) são extraídos do DataFrame uma única vez. Uma página de
+resultados é montada com uma indexação vetorial por campo, em vez de um
+`df.iloc[idx]` (uma Series nova) por filme.
+"""
+
+import numpy as np
+
+# Colunas copiadas do movies_info.csv (valores ausentes viram "N/A")
+FIELDS = [
+    "title",
+    "year",
+    "link",
+    "genres",
+    "streamings",
+    "movie_duration",
+    "age_classification",
+]
+
+
+class MetadataStore:
+    def __init__(self, df, preview_lengths=(100, 120)):
+        """
+        Args:
+            df: DataFrame dos filmes
+            preview_lengths: Tamanhos de sinopse truncada pré-calculados, disponíveis
+                             como campos `synopsis_<n>` (ex.: synopsis_100)
+        """
+        self.fields = {}
+        for column in FIELDS:
+            values = df[column].fillna("N/A").astype(str) if column in df else ["N/A"] * len(df)
+            self.fields[column] = self._readonly(values)
+
+        synopsis = df["synopsis_content"].fillna("N/A").astype(str) if "synopsis_content" in df else ["N/A"] * len(df)
+        for length in preview_lengths:
+            self.fields[f"synopsis_{length}"] = self._readonly([text[:length] + "..." for text in synopsis])
+
+    @staticmethod
+    def _readonly(values):
+        array = np.array(list(values), dtype=object)
+        array.flags.writeable = False
+        return array
+
+    def __len__(self):
+        return len(self.fields["title"])
+
+    def gather(self, indices, fields=None):
+        """
+        Campos de vários filmes de uma vez.
+
+        Returns:
+            Dicionário campo -> array com os valores na ordem de `indices`
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        return {field: self.fields[field][indices] for field in (fields or self.fields)}
+
+    def records(self, indices, fields=None):
+        """Os mesmos valores de `gather`, como uma lista de dicionários (um por filme)."""
+        columns = self.gather(indices, fields)
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
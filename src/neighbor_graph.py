@@ -0,0 +1,130 @@
+"""Grafo esparso dos k vizinhos mais próximos de cada filme (CSR)."""
+
+import numpy as np
+from pathlib import Path
+
+from vectorizer import top_k_indices
+
+
+class NeighborGraph:
+    def __init__(self, indptr, indices, scores, method="sbert", k=20):
+        """
+        Vizinhos de cada linha em formato CSR: os vizinhos da linha i são
+        `indices[indptr[i]:indptr[i + 1]]`, em ordem decrescente de score.
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self.method = method
+        self.k = k
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @staticmethod
+    def _top_neighbors(similarities, rows, k):
+        # Remove o próprio documento e pega os k maiores de cada linha
+        similarities[np.arange(len(rows)), rows] = -np.inf
+        k = min(k, similarities.shape[1] - 1)
+        top = top_k_indices(similarities, k)
+        return top, np.take_along_axis(similarities, top, axis=1)
+
+    @classmethod
+    def build(cls, vectorizer, method="sbert", k=20, memory_budget_mb=512, n_jobs=1):
+        """
+        Calcula os k vizinhos de todos os documentos com o motor em blocos.
+
+        Args:
+            vectorizer: Vectorizer com as representações já calculadas
+            method: 'sbert', 'tfidf' ou 'bow'
+            k: Vizinhos guardados por documento
+            memory_budget_mb: Memória para os blocos de scores
+            n_jobs: Threads processando blocos em paralelo
+        """
+        indices, scores = vectorizer.calculate_similarity_matrix(
+            method, top_k=k, memory_budget_mb=memory_budget_mb, n_jobs=n_jobs
+        )
+        n_docs, width = indices.shape
+        indptr = np.arange(n_docs + 1, dtype=np.int64) * width
+        return cls(indptr, indices.ravel().astype(np.int64), scores.ravel(), method, k)
+
+    def neighbors(self, row):
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.indices[start:end], self.scores[start:end]
+
+    def add_rows(self, vectorizer, block_size=1024):
+        """
+        Atualiza o grafo após acrescentar documentos ao final do vectorizer
+        (ex.: `Vectorizer.add_documents`).
+
+        Calcula a lista dos documentos novos e recalcula só as listas antigas
+        em que algum documento novo supera o k-ésimo vizinho atual.
+
+        Returns:
+            Linhas antigas cujas listas foram alteradas
+        """
+        n_old = len(self)
+        n_docs = vectorizer._n_documents()
+        new_rows = np.arange(n_old, n_docs)
+        lengths = np.diff(self.indptr)
+        changed = {}
+        new_lists = []
+
+        for start in range(0, len(new_rows), block_size):
+            rows = new_rows[start:start + block_size]
+            similarities = np.asarray(vectorizer.similarity_rows(rows, method=self.method), dtype=np.float32)
+
+            # Cosseno é simétrico: a coluna j de `similarities` são os scores da linha antiga j
+            cross = similarities[:, :n_old]
+            best_new = cross.max(axis=0)
+            kth_score = np.full(n_old, -np.inf, dtype=np.float32)
+            full = lengths >= min(self.k, n_docs - 1)
+            kth_score[full] = self.scores[self.indptr[1:][full] - 1]
+            for row in np.flatnonzero(best_new > kth_score):
+                old_indices, old_scores = changed.get(row, self.neighbors(row))
+                merged_indices = np.concatenate([old_indices, rows])
+                merged_scores = np.concatenate([old_scores, cross[:, row]])
+                top = top_k_indices(merged_scores, self.k)
+                changed[row] = (merged_indices[top], merged_scores[top])
+
+            top, top_scores = self._top_neighbors(similarities, rows, self.k)
+            new_lists.extend(zip(top, top_scores))
+
+        # Remonta o CSR copiando em bloco as listas que não mudaram
+        new_lengths = np.concatenate([lengths, [len(indices) for indices, _ in new_lists]])
+        for row, (indices, _) in changed.items():
+            new_lengths[row] = len(indices)
+        indptr = np.concatenate([[0], np.cumsum(new_lengths)])
+        indices = np.empty(indptr[-1], dtype=np.int64)
+        scores = np.empty(indptr[-1], dtype=np.float32)
+
+        entry_rows = np.repeat(np.arange(n_old), lengths)
+        keep = np.ones(len(entry_rows), dtype=bool)
+        if changed:
+            keep = ~np.isin(entry_rows, list(changed))
+        offsets = np.arange(len(entry_rows)) - self.indptr[entry_rows]
+        positions = indptr[entry_rows[keep]] + offsets[keep]
+        indices[positions] = self.indices[keep]
+        scores[positions] = self.scores[keep]
+
+        rewritten = list(changed.items()) + list(zip(range(n_old, n_old + len(new_lists)), new_lists))
+        for row, (row_indices, row_scores) in rewritten:
+            indices[indptr[row]:indptr[row + 1]] = row_indices
+            scores[indptr[row]:indptr[row + 1]] = row_scores
+
+        self.indptr, self.indices, self.scores = indptr, indices, scores
+        return sorted(changed)
+
+    def save(self, output_dir):
+        np.savez(
+            Path(output_dir) / f"neighbors_{self.method}.npz",
+            indptr=self.indptr,
+            indices=self.indices,
+            scores=self.scores,
+            k=self.k,
+        )
+
+    @classmethod
+    def load(cls, output_dir, method="sbert"):
+        with np.load(Path(output_dir) / f"neighbors_{method}.npz") as data:
+            return cls(data["indptr"], data["indices"], data["scores"], method, int(data["k"]))
@@ -0,0 +1,72 @@
+"""Projeção 2D dos filmes (PCA/SVD) que pode ser salva e reaplicada a novos títulos."""
+
+import numpy as np
+from pathlib import Path
+from scipy import sparse
+
+
+class Projector:
+    def __init__(self, components, mean, method="sbert"):
+        """
+        Projeção linear `(x - mean) @ components.T`.
+
+        Para matrizes esparsas `mean` é zero (SVD truncado, sem centralizar),
+        o que preserva a esparsidade.
+        """
+        self.components = components
+        self.mean = mean
+        self.method = method
+
+    @classmethod
+    def fit(cls, matrix, method="sbert", n_components=2, incremental_threshold=100_000, batch_size=10_000):
+        """
+        Ajusta a projeção escolhendo o algoritmo pelo tipo de entrada.
+
+        - CSR (tfidf/bow): TruncatedSVD randomizado, direto na matriz esparsa
+        - Densa com mais de `incremental_threshold` linhas: IncrementalPCA em blocos
+        - Densa pequena: PCA exato
+        """
+        if sparse.issparse(matrix):
+            from sklearn.decomposition import TruncatedSVD
+
+            svd = TruncatedSVD(n_components=n_components, algorithm="randomized", random_state=42)
+            svd.fit(matrix)
+            return cls(svd.components_, np.zeros(matrix.shape[1]), method)
+
+        if matrix.shape[0] > incremental_threshold:
+            from sklearn.decomposition import IncrementalPCA
+
+            pca = IncrementalPCA(n_components=n_components, batch_size=batch_size)
+            for start in range(0, matrix.shape[0], batch_size):
+                block = np.asarray(matrix[start:start + batch_size], dtype=np.float32)
+                if len(block) >= n_components:
+                    pca.partial_fit(block)
+            return cls(pca.components_, pca.mean_, method)
+
+        from sklearn.decomposition import PCA
+
+        pca = PCA(n_components=n_components, random_state=42)
+        pca.fit(matrix)
+        return cls(pca.components_, pca.mean_, method)
+
+    def transform(self, matrix, batch_size=10_000):
+        if sparse.issparse(matrix):
+            return np.asarray(matrix @ self.components.T) - self.mean @ self.components.T
+
+        coords = np.empty((matrix.shape[0], len(self.components)))
+        for start in range(0, matrix.shape[0], batch_size):
+            block = np.asarray(matrix[start:start + batch_size], dtype=np.float64)
+            coords[start:start + batch_size] = (block - self.mean) @ self.components.T
+        return coords
+
+    def save(self, output_dir):
+        np.savez(
+            Path(output_dir) / f"projector_{self.method}.npz",
+            components=self.components,
+            mean=self.mean,
+        )
+
+    @classmethod
+    def load(cls, output_dir, method="sbert"):
+        with np.load(Path(output_dir) / f"projector_{method}.npz") as data:
+            return cls(data["components"], data["mean"], method)
@@ -2,117 +2,450 @@
 
 import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
+from collections import OrderedDict
+
+from bm25_index import BM25Index
+from metadata_index import MetadataIndex
+from metadata_store import MetadataStore
+from neighbor_graph import NeighborGraph
+from vectorizer import top_k_indices
 
 class RecommendationSystem:
-    def __init__(self, df, vectorizer):
+    def __init__(self, df, vectorizer, row_cache_size=0):
         self.df = df
         self.vectorizer = vectorizer
         self.clusters = None
-        self.similarity_matrix = None
+        self.centroids = None
+        self.cluster_method = None
+        self.cluster_scores = None
+        self.cluster_stream = None
         self.pca_coords = None
+        self.projector = None
+        self.neighbor_graphs = {}
+        # Vectorizer.revision refletida em cada grafo (grafo desatualizado não é usado)
+        self._graph_revisions = {}
+        self.bm25_index = None
+        
+        # Índice título -> linha (primeira ocorrência, como o antigo list.index)
+        self.title_index = {}
+        for row, title in enumerate(self.df['title']):
+            self.title_index.setdefault(title, row)
+        
+        # Listas de postagem de gênero/plataforma/idade/ano para pré-filtrar as buscas
+        self.metadata_index = MetadataIndex(self.df)
+        # Campos exibidos nos resultados, em arrays (sem df.iloc por resultado)
+        self.metadata = MetadataStore(self.df)
+        
+        # Cache LRU opcional de linhas de similaridade, chaveado por (método, linha)
+        self.row_cache_size = row_cache_size
+        self._row_cache = OrderedDict()
     
-    def perform_clustering(self, method="sbert", n_clusters=10):
+    def perform_clustering(self, method="sbert", n_clusters=10, mode="kmeans",
+                           k_candidates=range(2, 21), sample_size=5000,
+                           scoring="silhouette", n_jobs=-1):
+        """
+        Agrupa os filmes.
+        
+        mode='kmeans' usa o KMeans completo; mode='minibatch' treina um
+        MiniBatchKMeans lendo a matriz em blocos (funciona com CSR e memmap sem
+        densificar). Com n_clusters=None, k é escolhido avaliando
+        `k_candidates` em paralelo sobre uma amostra.
+        """
+        from clustering import minibatch_kmeans, select_n_clusters
+        
+        # Obter embeddings (esparsos para tfidf/bow, sem .toarray())
+        embeddings = self.vectorizer.get_representation(method)
+        
         # Determinar número de clusters automaticamente
         if n_clusters is None:
-            n_samples = len(self.df)
-            if n_samples <= 10:
-                n_clusters = 3
-            elif n_samples <= 30:
-                n_clusters = 4
-            elif n_samples <= 60:
-                n_clusters = 5
-            else:
-                n_clusters = 6
+            n_clusters, self.cluster_scores = select_n_clusters(
+                embeddings, k_candidates, sample_size, scoring, n_jobs
+            )
+            print(f"Número de clusters escolhido ({scoring}): {n_clusters}")
         
-        # Obter embeddings
-        if method == "sbert":
-            embeddings = self.vectorizer.sbert_embeddings
-        elif method == "tfidf":
-            embeddings = self.vectorizer.tfidf_matrix.toarray()
+        # Clustering
+        if mode == "minibatch":
+            model, self.clusters = minibatch_kmeans(embeddings, n_clusters)
         else:
-            embeddings = self.vectorizer.bow_matrix.toarray()
+            from sklearn.cluster import KMeans
+            model = KMeans(n_clusters=n_clusters, random_state=42)
+            self.clusters = model.fit_predict(embeddings)
         
-        # Clustering
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        self.clusters = kmeans.fit_predict(embeddings)
+        self.centroids = model.cluster_centers_
+        self.cluster_method = method
+        
+        # Estado para atribuir títulos novos sem refazer o clustering
+        from cluster_stream import ClusterStream
+        self.cluster_stream = ClusterStream.from_clustering(
+            embeddings, self.clusters, self.centroids, method
+        )
         
         return pd.DataFrame({
             'title': self.df['title'],
             'cluster': self.clusters
         })
     
+    def assign_new_titles(self):
+        """
+        Atribui cluster aos títulos acrescentados depois do último clustering
+        (ex.: via Vectorizer.add_documents) e retorna as métricas de drift.
+        
+        Quando `needs_reclustering` é True, vale rodar perform_clustering de novo.
+        """
+        if self.cluster_stream is None or self.clusters is None:
+            raise ValueError("Clustering não disponível. Chame perform_clustering() primeiro.")
+        
+        matrix = self.vectorizer.get_representation(self.cluster_stream.method)
+        start = len(self.clusters)
+        if matrix.shape[0] > start:
+            labels = self.cluster_stream.assign(matrix[start:])
+            self.clusters = np.concatenate([self.clusters, labels])
+            self.centroids = self.cluster_stream.centroids
+        
+        drift = self.cluster_stream.drift()
+        if drift["needs_reclustering"]:
+            print(f"Drift detectado nos clusters, recomenda-se refazer o clustering: {drift}")
+        return drift
+    
+    def load_cluster_stream(self, input_dir, method="sbert"):
+        from cluster_stream import ClusterStream
+        
+        self.cluster_stream = ClusterStream.load(input_dir, method)
+        self.cluster_method = method
+        self.centroids = self.cluster_stream.centroids
+        
+        # Labels das linhas já atribuídas; estados salvos sem eles usam o cluster_labels.csv
+        labels = self.cluster_stream.labels
+        if labels is None:
+            from pathlib import Path
+            labels = pd.read_csv(Path(input_dir) / "cluster_labels.csv", sep=";")['cluster'].to_numpy()
+            self.cluster_stream.labels = labels
+        self.clusters = labels
+        return self.cluster_stream
+    
     def create_pca_projection(self, method="sbert"):
-        # Obter embeddings
-        if method == "sbert":
-            embeddings = self.vectorizer.sbert_embeddings
-        elif method == "tfidf":
-            embeddings = self.vectorizer.tfidf_matrix.toarray()
-        else:
-            embeddings = self.vectorizer.bow_matrix.toarray()
+        # TF-IDF/BoW: SVD truncado direto na matriz esparsa; embeddings grandes: PCA incremental
+        from projection import Projector
         
-        # PCA
-        pca = PCA(n_components=2, random_state=42)
-        self.pca_coords = pca.fit_transform(embeddings)
+        embeddings = self.vectorizer.get_representation(method)
+        self.projector = Projector.fit(embeddings, method)
+        self.pca_coords = self.projector.transform(embeddings)
         
+        return self._pca_dataframe()
+    
+    def project(self, embeddings):
+        # Projeta novos títulos com a projeção já ajustada, sem reajustar
+        if self.projector is None:
+            raise ValueError("Projeção não disponível. Chame create_pca_projection() primeiro.")
+        return self.projector.transform(embeddings)
+    
+    def _pca_dataframe(self):
         pca_df = pd.DataFrame(self.pca_coords, columns=["pc1", "pc2"])
         pca_df.insert(0, 'title', self.df['title'])
         if self.clusters is not None:
             pca_df.insert(1, 'cluster', self.clusters)
-        
         return pca_df
     
-    def recommend_by_title(self, title, method="sbert", top_k=5):
+    def _similarity_row(self, movie_idx, method):
+        key = (method, movie_idx)
+        if key in self._row_cache:
+            self._row_cache.move_to_end(key)
+            return self._row_cache[key]
+        
+        similarities = self.vectorizer.similarity_row(movie_idx, method)
+        if self.row_cache_size > 0:
+            self._row_cache[key] = similarities
+            while len(self._row_cache) > self.row_cache_size:
+                self._row_cache.popitem(last=False)
+        return similarities
+    
+    def build_neighbor_graph(self, method="sbert", k=20):
+        self.neighbor_graphs[method] = NeighborGraph.build(self.vectorizer, method, k)
+        self._graph_revisions[method] = self.vectorizer.revision
+        return self.neighbor_graphs[method]
+    
+    def update_neighbor_graphs(self):
+        # Após Vectorizer.add_documents só as listas afetadas pelos novos títulos mudam;
+        # após update/remove_documents as listas antigas não valem mais e o grafo é refeito
+        self.title_index = {}
+        for row, title in enumerate(self.df['title']):
+            self.title_index.setdefault(title, row)
+        self.metadata_index = MetadataIndex(self.df)
+        self.metadata = MetadataStore(self.df)
+        self._row_cache.clear()
+        for method, graph in self.neighbor_graphs.items():
+            if self._graph_revisions.get(method, -1) >= self.vectorizer.rewrite_revision:
+                graph.add_rows(self.vectorizer)
+            else:
+                self.neighbor_graphs[method] = NeighborGraph.build(self.vectorizer, method, graph.k)
+            self._graph_revisions[method] = self.vectorizer.revision
+    
+    def load_neighbor_graphs(self, input_dir):
+        from pathlib import Path
+        for path in Path(input_dir).glob("neighbors_*.npz"):
+            method = path.stem[len("neighbors_"):]
+            graph = NeighborGraph.load(input_dir, method)
+            # Grafo salvo com outro corpus (ex.: antes de remover títulos) é ignorado
+            if len(graph) == self.vectorizer._n_documents():
+                self.neighbor_graphs[method] = graph
+                self._graph_revisions[method] = self.vectorizer.revision
+    
+    def _neighbor_graph(self, method, top_k):
+        # Grafo de `method`, se cobrir `top_k` e refletir o estado atual do vectorizer
+        graph = self.neighbor_graphs.get(method)
+        if graph is None or top_k > graph.k or self._graph_revisions.get(method) != self.vectorizer.revision:
+            return None
+        return graph
+    
+    def build_bm25_index(self, column="synopsis_stemming"):
+        self.bm25_index = BM25Index.build(self.df[column])
+        return self.bm25_index
+    
+    def load_bm25_index(self, input_dir):
+        self.bm25_index = BM25Index.load(input_dir)
+        return self.bm25_index
+    
+    def recommend_hybrid(self, query, top_k=5, mode="hybrid", fusion="rrf", weight=0.5,
+                         rrf_k=60, n_candidates=50, filters=None):
+        """
+        Busca híbrida: BM25 (palavras exatas, ex.: nomes e lugares) + SBERT.
+        
+        mode='lexical' responde só com o índice BM25, sem passar a query
+        pelo modelo; mode='semantic' usa só o SBERT. No modo 'hybrid', os
+        `n_candidates` melhores de cada lado são combinados por
+        fusion='rrf' (1 / (rrf_k + posição)) ou fusion='weighted'
+        (`weight` * SBERT + (1 - `weight`) * BM25, scores normalizados em [0, 1]).
+        """
+        candidates = self._candidates(filters)
+        ranked = []
+        if mode in ("lexical", "hybrid"):
+            if self.bm25_index is None:
+                raise ValueError("Índice BM25 não disponível. Chame build_bm25_index() primeiro.")
+            lexical_k = top_k if mode == "lexical" else n_candidates
+            ranked.append((1 - weight, self.bm25_index.search(query, lexical_k, candidates)))
+        if mode in ("semantic", "hybrid"):
+            semantic_k = top_k if mode == "semantic" else n_candidates
+            indices, scores = self.vectorizer.search_vectors(
+                self.vectorizer.encode_queries([query]), semantic_k, candidates=candidates
+            )
+            valid = indices[0] >= 0
+            ranked.append((weight, (indices[0][valid], scores[0][valid])))
+        if not ranked:
+            raise ValueError(f"Modo '{mode}' não disponível")
+        
+        if len(ranked) == 1:
+            top_indices, top_scores = ranked[0][1]
+        else:
+            fused = {}
+            for list_weight, (indices, scores) in ranked:
+                if fusion == "rrf":
+                    contributions = 1.0 / (rrf_k + np.arange(1, len(indices) + 1))
+                elif fusion == "weighted":
+                    span = scores.max() - scores.min() if len(scores) else 0.0
+                    contributions = list_weight * (scores - scores.min()) / span if span > 0 else np.full(len(scores), list_weight)
+                else:
+                    raise ValueError(f"Fusão '{fusion}' não disponível")
+                for idx, contribution in zip(indices, contributions):
+                    fused[int(idx)] = fused.get(int(idx), 0.0) + float(contribution)
+            fused_indices = np.fromiter(fused.keys(), dtype=np.int64, count=len(fused))
+            fused_scores = np.fromiter(fused.values(), dtype=np.float64, count=len(fused))
+            best = top_k_indices(fused_scores, top_k)
+            top_indices, top_scores = fused_indices[best], fused_scores[best]
+        
+        return self._recommendations(top_indices[:top_k], top_scores[:top_k], 'score', synopsis=True)
+    
+    def _recommendations(self, indices, scores, score_key='similarity', synopsis=False):
+        # Busca os metadados de todos os resultados de uma vez no MetadataStore
+        data = self.metadata.gather(indices, ['title', 'genres', 'synopsis_100'])
+        recommendations = []
+        for i, score in enumerate(scores):
+            recommendation = {'rank': i + 1, 'title': data['title'][i], score_key: float(score)}
+            if synopsis:
+                recommendation['synopsis'] = data['synopsis_100'][i]
+            recommendation['genres'] = data['genres'][i]
+            recommendations.append(recommendation)
+        return recommendations
+    
+    def _candidates(self, filters):
+        # Linhas que passam no filtro de metadados (None = corpus inteiro)
+        if filters is None:
+            return None
+        return self.metadata_index.filter(filters)
+    
+    def _top_similar(self, movie_idx, method, top_k, candidates=None):
+        if candidates is not None:
+            # Pré-filtro: pontua só as linhas candidatas (sem o próprio filme)
+            candidates = candidates[candidates != movie_idx]
+            if len(candidates) == 0:
+                return candidates, np.empty(0, dtype=np.float32)
+            similarities = self.vectorizer.similarity_rows(np.array([movie_idx]), method, candidates)[0]
+            top = top_k_indices(similarities, top_k)
+            return candidates[top], similarities[top]
+        
+        # Usa o grafo pré-calculado quando ele cobre o pedido
+        graph = self._neighbor_graph(method, top_k)
+        if graph is not None:
+            indices, scores = graph.neighbors(movie_idx)
+            return indices[:top_k], scores[:top_k]
+        
+        # Calcular só a linha de similaridade do filme (O(n), não O(n²))
+        similarities = self._similarity_row(movie_idx, method)
+        top_indices = np.array(
+            [idx for idx in top_k_indices(similarities, top_k + 1) if idx != movie_idx][:top_k],
+            dtype=np.int64,
+        )
+        return top_indices, similarities[top_indices]
+    
+    def recommend_by_title(self, title, method="sbert", top_k=5, filters=None):
         # Encontrar índice do filme
-        titles = self.df['title'].tolist()
-        try:
-            movie_idx = titles.index(title)
-        except ValueError:
+        movie_idx = self.title_index.get(title)
+        if movie_idx is None:
             raise ValueError(f"Filme '{title}' não encontrado")
         
-        # Calcular similaridade
-        if self.similarity_matrix is None:
-            self.similarity_matrix = self.vectorizer.calculate_similarity_matrix(method)
+        top_indices, top_scores = self._top_similar(movie_idx, method, top_k, self._candidates(filters))
         
-        similarities = self.similarity_matrix[movie_idx]
-        sim_scores = [(i, sim) for i, sim in enumerate(similarities) if i != movie_idx]
-        sim_scores.sort(key=lambda x: x[1], reverse=True)
+        return self._recommendations(top_indices, top_scores)
+    
+    def recommend_by_query(self, query, top_k=5, filters=None, mmr_lambda=None, n_candidates=50):
+        # filters: ex. "genre=Terror AND platform=Netflix AND year>=2020" (ver metadata_index.py)
+        # mmr_lambda: se informado, reordena `n_candidates` resultados por diversidade (MMR)
+        search_k = top_k if mmr_lambda is None else max(top_k, n_candidates)
+        indices, scores = self.vectorizer.search_vectors(
+            self.vectorizer.encode_queries([query]), search_k, candidates=self._candidates(filters)
+        )
+        valid = indices[0] >= 0
+        indices, scores = indices[0][valid], scores[0][valid]
+        if mmr_lambda is not None:
+            indices, scores = self.diversify(indices, scores, top_k, mmr_lambda)
         
-        # Retornar recomendações
-        recommendations = []
-        for i, (idx, similarity) in enumerate(sim_scores[:top_k]):
-            movie_data = self.df.iloc[idx]
-            recommendations.append({
-                'rank': i + 1,
-                'title': movie_data['title'],
-                'similarity': float(similarity),
-                'genres': movie_data.get('genres', 'N/A')
-            })
+        return self._recommendations(indices, scores, synopsis=True)
+    
+    def diversify(self, indices, scores, top_k=5, lambda_=0.7, method="sbert"):
+        """
+        Reordena candidatos com MMR (ver reranking.py).
         
-        return recommendations
+        Retorna (indices, scores) dos `top_k` escolhidos, com os scores de
+        relevância originais.
+        """
+        from reranking import mmr
+        
+        indices = np.asarray(indices, dtype=np.int64)
+        vectors = self.vectorizer.get_representation(method)[indices]
+        if method != "sbert":
+            # TF-IDF/BoW: normaliza as linhas para que a matriz de Gram seja o cosseno
+            from sklearn.preprocessing import normalize
+            vectors = normalize(vectors).toarray()
+        order = mmr(scores, vectors, top_k, lambda_)
+        return indices[order], np.asarray(scores)[order]
     
-    def recommend_by_query(self, query, top_k=5):
-        similar_docs = self.vectorizer.search_similar_documents(query, top_k)
+    def _rows_of_titles(self, titles):
+        rows = np.empty(len(titles), dtype=np.int64)
+        for i, title in enumerate(titles):
+            row = self.title_index.get(title)
+            if row is None:
+                raise ValueError(f"Filme '{title}' não encontrado")
+            rows[i] = row
+        return rows
+    
+    def _columnar(self, queries, indices, scores, columns):
+        # Formato longo: uma linha por (consulta, posição), metadados por indexação vetorial
+        valid = indices >= 0
+        query_pos, ranks = np.nonzero(valid)
+        hits = indices[valid]
+        result = pd.DataFrame({
+            'query': np.asarray(queries, dtype=object)[query_pos],
+            'rank': ranks + 1,
+            'index': hits,
+            'similarity': scores[valid],
+        })
+        for column in columns:
+            values = self.metadata.fields.get(column)
+            result[column] = (values if values is not None else self.df[column].to_numpy())[hits]
+        return result
+    
+    def recommend_by_titles(self, titles, method="sbert", top_k=5, columns=None, batch_size=256, filters=None):
+        """
+        Recomendações para vários títulos de uma vez.
         
-        recommendations = []
-        for i, (idx, similarity) in enumerate(similar_docs):
-            movie_data = self.df.iloc[idx]
-            recommendations.append({
-                'rank': i + 1,
-                'title': movie_data['title'],
-                'similarity': float(similarity),
-                'synopsis': movie_data.get('synopsis_content', 'N/A')[:100] + "...",
-                'genres': movie_data.get('genres', 'N/A')
-            })
+        Usa o grafo de vizinhos quando ele cobre `top_k`; senão calcula as
+        linhas de similaridade em lotes de `batch_size` títulos (um produto de
+        matrizes por lote).
         
-        return recommendations
+        Retorna (indices, scores) com shape (len(titles), top_k), com -1/-inf
+        onde não há vizinho; com `columns`, um DataFrame em formato longo
+        (query, rank, index, similarity + colunas pedidas do df). Com
+        `filters`, só os filmes que passam no filtro de metadados são pontuados.
+        """
+        titles = list(titles)
+        rows = self._rows_of_titles(titles)
+        candidates = self._candidates(filters)
+        top_k = min(top_k, len(self.df) - 1 if candidates is None else len(candidates))
+        indices = np.full((len(rows), top_k), -1, dtype=np.int64)
+        scores = np.full((len(rows), top_k), -np.inf, dtype=np.float32)
+        
+        graph = self._neighbor_graph(method, top_k)
+        if candidates is not None:
+            # Filtro sem nenhum filme: top_k = 0 e não há o que pontuar
+            for start in range(0, len(rows) if top_k else 0, batch_size):
+                block = rows[start:start + batch_size]
+                similarities = np.asarray(
+                    self.vectorizer.similarity_rows(block, method, candidates), dtype=np.float32
+                )
+                # O próprio filme, se passar no filtro, não conta como vizinho
+                positions = np.minimum(np.searchsorted(candidates, block), len(candidates) - 1)
+                is_self = candidates[positions] == block
+                similarities[np.flatnonzero(is_self), positions[is_self]] = -np.inf
+                top = top_k_indices(similarities, top_k)
+                top_scores = np.take_along_axis(similarities, top, axis=1)
+                indices[start:start + len(block)] = np.where(np.isneginf(top_scores), -1, candidates[top])
+                scores[start:start + len(block)] = top_scores
+        elif graph is not None:
+            starts = graph.indptr[rows]
+            lengths = graph.indptr[rows + 1] - starts
+            positions = starts[:, None] + np.arange(top_k)
+            valid = np.arange(top_k) < lengths[:, None]
+            indices[valid] = graph.indices[positions[valid]]
+            scores[valid] = graph.scores[positions[valid]]
+        else:
+            for start in range(0, len(rows), batch_size):
+                block = rows[start:start + batch_size]
+                similarities = np.asarray(self.vectorizer.similarity_rows(block, method), dtype=np.float32)
+                top, top_scores = NeighborGraph._top_neighbors(similarities, block, top_k)
+                indices[start:start + len(block)] = top
+                scores[start:start + len(block)] = top_scores
+        
+        if columns is not None:
+            return self._columnar(titles, indices, scores, columns)
+        return indices, scores
+    
+    def recommend_by_queries(self, queries, top_k=5, columns=None, batch_size=256, approximate=False, filters=None):
+        """
+        Recomendações para várias queries textuais de uma vez (SBERT).
+        
+        Codifica todas as queries e calcula os scores com um produto de
+        matrizes por lote. Retorno no mesmo formato de `recommend_by_titles`.
+        """
+        queries = list(queries)
+        query_vectors = self.vectorizer.encode_queries(queries)
+        indices, scores = self.vectorizer.search_vectors(
+            query_vectors, top_k, batch_size, approximate, self._candidates(filters)
+        )
+        
+        if columns is not None:
+            return self._columnar(queries, indices, scores, columns)
+        return indices, scores
     
     def save_results(self, output_dir):
         from pathlib import Path
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
+        if self.clusters is not None and len(self.clusters) != len(self.df):
+            raise ValueError(
+                f"{len(self.clusters)} labels de cluster para {len(self.df)} filmes. "
+                "Chame assign_new_titles() depois de acrescentar títulos."
+            )
+        
         if self.clusters is not None:
             cluster_df = pd.DataFrame({
                 'title': self.df['title'],
@@ -120,14 +453,19 @@ class RecommendationSystem:
             })
             cluster_df.to_csv(output_path / "cluster_labels.csv", index=False, sep=";")
         
+        if self.centroids is not None:
+            np.save(output_path / f"cluster_centroids_{self.cluster_method}.npy", self.centroids)
+        
+        if self.cluster_stream is not None:
+            self.cluster_stream.save(output_path)
+        
         if self.pca_coords is not None:
-            pca_df = self.create_pca_projection()
-            pca_df.to_csv(output_path / "cluster_pca2d.csv", index=False, sep=";")
-        
-        if self.similarity_matrix is not None:
-            sim_df = pd.DataFrame(
-                self.similarity_matrix,
-                index=self.df['title'],
-                columns=self.df['title']
-            )
-            sim_df.to_csv(output_path / "similarity_matrix.csv", sep=";")
\ No newline at end of file
+            self._pca_dataframe().to_csv(output_path / "cluster_pca2d.csv", index=False, sep=";")
+            self.projector.save(output_path)
+        
+        # Em vez da matriz densa n x n, salva os k vizinhos de cada filme
+        for graph in self.neighbor_graphs.values():
+            graph.save(output_path)
+        
+        if self.bm25_index is not None:
+            self.bm25_index.save(output_path)
\ No newline at end of file
@@ -0,0 +1,45 @@
+"""Reordenação por diversidade com Maximal Marginal Relevance (MMR)."""
+
+import numpy as np
+
+
+def mmr(relevance, vectors, top_k=5, lambda_=0.7):
+    """
+    Escolhe `top_k` candidatos equilibrando relevância e diversidade.
+
+    A cada passo escolhe o candidato que maximiza
+    `lambda_ * relevância - (1 - lambda_) * maior similaridade com os já escolhidos`.
+    As similaridades entre candidatos vêm de uma única matriz de Gram
+    (candidatos x candidatos); o laço guloso só faz operações vetoriais sobre ela.
+
+    Args:
+        relevance: Score de cada candidato em relação à query, shape (n,)
+        vectors: Vetores normalizados dos candidatos, shape (n, d)
+        top_k: Quantidade de candidatos escolhidos
+        lambda_: 1.0 = só relevância (ordem original); 0.0 = só diversidade
+
+    Returns:
+        Posições dos candidatos escolhidos (índices em `relevance`), na ordem de escolha
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)
+    n = len(relevance)
+    top_k = min(top_k, n)
+    if top_k == 0:
+        return np.empty(0, dtype=np.int64)
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    gram = vectors @ vectors.T
+
+    selected = np.empty(top_k, dtype=np.int64)
+    max_similarity = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    for step in range(top_k):
+        scores = lambda_ * relevance - (1 - lambda_) * max_similarity
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        selected[step] = pick
+        available[pick] = False
+        # Similaridade de cada candidato com o escolhido mais parecido até agora
+        max_similarity = np.maximum(max_similarity, gram[pick]) if step else gram[pick].copy()
+
+    return selected
@@ -0,0 +1,153 @@
+"""Codificação SBERT em blocos, ordenada por tamanho e opcionalmente multiprocesso."""
+
+import os
+import time
+import numpy as np
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from vectorizer import SBERT_MODEL_NAME
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Modelo carregado uma vez por processo do pool
+_worker_model = None
+
+
+def _init_worker(model_name, n_threads):
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(n_threads)
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_in_worker(texts, batch_size):
+    return _worker_model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+
+
+def _peak_memory_mb():
+    """Pico de memória residente (processo atual + filhos), em MB."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return (usage + children) / 1024  # ru_maxrss em KB no Linux
+
+
+class SbertEncoder:
+    def __init__(
+        self,
+        model_name: str = SBERT_MODEL_NAME,
+        batch_size: int = 32,
+        chunk_size: int = 1024,
+        n_workers: int = 1,
+        model=None,
+        verbose: bool = True,
+    ):
+        """
+        Codifica um corpus em blocos, escrevendo direto na matriz de saída.
+
+        Args:
+            model_name: Modelo SentenceTransformer
+            batch_size: Tamanho do lote enviado ao modelo
+            chunk_size: Documentos por bloco (unidade de trabalho de cada processo)
+            n_workers: Processos de CPU; 1 codifica no próprio processo
+            model: Modelo já carregado, usado quando n_workers == 1
+            verbose: Mostra progresso e vazão a cada bloco
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.n_workers = n_workers
+        self.model = model
+        self.verbose = verbose
+        self.stats = None
+
+    def _sort_order(self, texts):
+        # Ordena por tamanho (maiores primeiro) para lotes com pouco padding
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is not None:
+            lengths = [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+        else:
+            lengths = [len(text.split()) for text in texts]
+        return np.argsort(-np.asarray(lengths), kind="stable")
+
+    def _chunks(self, order):
+        for start in range(0, len(order), self.chunk_size):
+            yield order[start:start + self.chunk_size]
+
+    def _report(self, done, total, start_time):
+        if self.verbose:
+            elapsed = time.perf_counter() - start_time
+            print(f"SBERT: {done}/{total} documentos ({done / max(elapsed, 1e-9):.1f} docs/s)")
+
+    def encode(self, texts, out=None):
+        """
+        Codifica os textos e devolve os embeddings na ordem original.
+
+        Args:
+            texts: Lista de textos
+            out: Matriz (n, dim) pré-alocada ou np.memmap gravável; se None,
+                 é alocada após o primeiro bloco
+
+        Returns:
+            Matriz de embeddings normalizados (a própria `out`, se informada)
+        """
+        texts = list(texts)
+        start_time = time.perf_counter()
+        done = 0
+
+        def store(rows, embeddings):
+            nonlocal out, done
+            if out is None:
+                out = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+            out[rows] = embeddings
+            done += len(rows)
+            self._report(done, len(texts), start_time)
+
+        order = self._sort_order(texts) if texts else np.empty(0, dtype=np.int64)
+
+        if self.n_workers <= 1:
+            if self.model is None:
+                from sentence_transformers import SentenceTransformer
+                self.model = SentenceTransformer(self.model_name)
+            for rows in self._chunks(order):
+                store(rows, self.model.encode(
+                    [texts[i] for i in rows], batch_size=self.batch_size, normalize_embeddings=True
+                ))
+        else:
+            n_threads = max(1, (os.cpu_count() or 1) // self.n_workers)
+            with ProcessPoolExecutor(
+                self.n_workers, initializer=_init_worker, initargs=(self.model_name, n_threads)
+            ) as executor:
+                # Limita os blocos em andamento para não acumular resultados na memória
+                pending = {}
+                for rows in self._chunks(order):
+                    if len(pending) >= 2 * self.n_workers:
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            store(pending.pop(future), future.result())
+                    future = executor.submit(
+                        _encode_in_worker, [texts[i] for i in rows], self.batch_size
+                    )
+                    pending[future] = rows
+                for future in wait(pending).done:
+                    store(pending[future], future.result())
+
+        elapsed = time.perf_counter() - start_time
+        self.stats = {
+            "documents": len(texts),
+            "seconds": elapsed,
+            "docs_per_sec": len(texts) / elapsed if elapsed > 0 else 0.0,
+            "peak_memory_mb": _peak_memory_mb(),
+        }
+        if self.verbose:
+            print(f"SBERT: {self.stats}")
+
+        if out is None:
+            out = np.empty((0, 0), dtype=np.float32)
+        return out
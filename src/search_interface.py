@@ -1,14 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
+import numpy as np
 import pandas as pd
 import os
 import webbrowser
 import threading
-from vectorizer import Vectorizer
+from vectorizer import Vectorizer, build_enriched_texts
+from embedding_cache import EmbeddingCache
 from recommendation_system import RecommendationSystem
-from knn import KNN
+from knn import KNN, NearestCentroid
 from dotenv import load_dotenv
-import google.generativeai as genai
 
 
 class MovieSearchGUI:
@@ -24,6 +25,8 @@ class MovieSearchGUI:
         self.knn_classifier = None
         self.clusters = None
         self.search_results = []
+        # Peso da relevância no MMR (1.0 = sem diversificação)
+        self.mmr_lambda = 0.7
         self.gemini_model = None
         self.gemini_enabled = False
         self.embeddings_loaded = False
@@ -34,23 +37,26 @@ class MovieSearchGUI:
         self.load_data()
 
     def setup_gemini(self):
-        """Configura a API do Gemini."""
-        try:
-            load_dotenv()
-            api_key = os.getenv("GOOGLE_API_KEY")
-
-            if api_key:
-                genai.configure(api_key=api_key)
-                self.gemini_model = genai.GenerativeModel("gemini-2.0-flash-lite")
-                self.gemini_enabled = True
-                print("Gemini API configurada com sucesso!")
-            else:
-                print("Aviso: GOOGLE_API_KEY não encontrada no arquivo .env")
-                self.gemini_enabled = False
-        except Exception as e:
-            print(f"Aviso: Não foi possível configurar Gemini: {e}")
+        """Verifica a chave da API do Gemini; o cliente só é criado no primeiro uso."""
+        load_dotenv()
+        self.gemini_api_key = os.getenv("GOOGLE_API_KEY")
+
+        if self.gemini_api_key:
+            self.gemini_enabled = True
+        else:
+            print("Aviso: GOOGLE_API_KEY não encontrada no arquivo .env")
             self.gemini_enabled = False
 
+    def _get_gemini_model(self):
+        """Importa e configura o cliente do Gemini na primeira chamada."""
+        if self.gemini_model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.gemini_api_key)
+            self.gemini_model = genai.GenerativeModel("gemini-2.0-flash-lite")
+            print("Gemini API configurada com sucesso!")
+        return self.gemini_model
+
     def setup_styles(self):
         """Configura estilos e cores da interface."""
         style = ttk.Style()
@@ -172,6 +178,14 @@ class MovieSearchGUI:
         )
         knn_check.pack(side=tk.LEFT, padx=(0, 20))
 
+        self.use_mmr_var = tk.BooleanVar(value=False)
+        mmr_check = ttk.Checkbutton(
+            controls_frame,
+            text="Diversificar (MMR)",
+            variable=self.use_mmr_var,
+        )
+        mmr_check.pack(side=tk.LEFT, padx=(0, 20))
+
         self.search_button = ttk.Button(
             controls_frame, text="Buscar", command=self.perform_search
         )
@@ -248,15 +262,15 @@ class MovieSearchGUI:
 
                 self.vectorizer = Vectorizer()
 
-                # Criar textos enriquecidos com gêneros para melhor precisão
-                enriched_texts = []
-                for idx, row in self.df.iterrows():
-                    synopsis = str(row.get("synopsis_content", "")).strip()
-                    genres = str(row.get("genres", "")).strip()
-                    enriched_text = f"{synopsis}. Gêneros: {genres}. {genres}."
-                    enriched_texts.append(enriched_text)
-
-                self.vectorizer.create_sbert_embeddings(enriched_texts)
+                # Criar textos enriquecidos com gêneros para melhor precisão.
+                # Embeddings já calculados vêm do cache; só títulos novos ou
+                # alterados passam pelo modelo.
+                enriched_texts = build_enriched_texts(self.df)
+                cache = EmbeddingCache(
+                    os.path.join(base_path, "data", "vectorized", "sbert_cache.npz")
+                )
+                self.vectorizer.create_sbert_embeddings(enriched_texts, cache=cache)
+                print(f"Cache de embeddings: {cache.stats()}")
 
                 self.recommender = RecommendationSystem(self.df, self.vectorizer)
 
@@ -282,15 +296,51 @@ class MovieSearchGUI:
             cluster_df = pd.read_csv(cluster_path, sep=";")
             self.clusters = cluster_df["cluster"].values
             
-            # Carrega modelo KNN
-            self.knn_classifier = KNN(k_neighbors=5, metric="cosine")
+            # Com os centróides do clustering salvos, classifica pelo centróide
+            # mais próximo (sem treino); senão, treina o KNN
+            if os.path.exists(NearestCentroid.centroids_path(base_path)):
+                self.knn_classifier = NearestCentroid().load(base_path)
+                print(f"Classificador por centróide carregado com {len(set(self.clusters))} clusters")
+                return
+            
+            self.knn_classifier = KNN(k_neighbors=5, metric="cosine", backend="auto")
             self.knn_classifier.load_and_train(base_path=base_path)
             
             print(f"KNN carregado com {len(set(self.clusters))} clusters")
         except Exception as e:
             print(f"Aviso: KNN não disponível: {e}")
 
-    def search_with_knn_boost(self, query, top_k=5, use_cluster_filter=True):
+    def search_with_mmr(self, query, top_k=5, n_candidates=50, query_embedding=None, boost_cluster=None):
+        """
+        Busca com re-ranking por diversidade (MMR) sobre os melhores candidatos.
+
+        Args:
+            query: Texto da busca
+            top_k: Número de resultados
+            n_candidates: Candidatos reordenados pelo MMR
+            query_embedding: Vetor da query já calculado (opcional)
+            boost_cluster: Cluster da query; filmes dele ganham 10% de relevância na ordenação
+
+        Returns:
+            Lista de (idx, similarity) dos filmes escolhidos
+        """
+        if query_embedding is None:
+            query_embedding = self.vectorizer.encode_query(query)
+        candidates = self.vectorizer.search_similar_documents(
+            query, max(top_k, n_candidates), query_vector=query_embedding
+        )
+        indices = np.array([idx for idx, _ in candidates], dtype=np.int64)
+        similarities = np.array([sim for _, sim in candidates], dtype=np.float32)
+        relevance = similarities
+        if boost_cluster is not None and len(indices):
+            relevance = similarities * np.where(self.clusters[indices] == boost_cluster, 1.1, 1.0)
+
+        # O bônus só influencia a ordem; o resultado exibe o cosseno original
+        chosen, _ = self.recommender.diversify(indices, relevance, top_k, self.mmr_lambda)
+        similarity_of = dict(zip(indices.tolist(), similarities.tolist()))
+        return [(int(idx), similarity_of[int(idx)]) for idx in chosen]
+
+    def search_with_knn_boost(self, query, top_k=5, use_cluster_filter=True, use_mmr=False):
         """
         Busca melhorada usando KNN para filtrar por cluster.
         
@@ -298,23 +348,38 @@ class MovieSearchGUI:
             query: Texto da busca
             top_k: Número de resultados
             use_cluster_filter: Se True, filtra por cluster
+            use_mmr: Se True, a diversidade vem do MMR em vez da divisão 70/30
         
         Returns:
             Lista de (idx, similarity) dos filmes mais relevantes
         """
+        # A query é codificada uma única vez (ou vem do cache) e o vetor é
+        # reaproveitado na classificação e na busca
+        query_embedding = self.vectorizer.encode_query(query)
+
         if self.knn_classifier is None or self.clusters is None:
             # Fallback: busca normal sem KNN
-            return self.vectorizer.search_similar_documents(query, top_k)
+            if use_mmr:
+                return self.search_with_mmr(query, top_k, query_embedding=query_embedding)
+            return self.vectorizer.search_similar_documents(
+                query, top_k, query_vector=query_embedding
+            )
         
         # 1. Determinar cluster da query
-        query_embedding = self.vectorizer.sbert_model.encode([query], normalize_embeddings=True)
-        query_cluster = self.knn_classifier.predict(query_embedding)[0]
+        query_cluster = self.knn_classifier.predict(query_embedding.reshape(1, -1))[0]
         
         print(f"KNN: Query classificada no cluster {query_cluster}")
         
-        if use_cluster_filter:
+        if use_mmr:
+            # Relevância com bônus para o cluster da query, diversidade pelo MMR
+            return self.search_with_mmr(
+                query, top_k, query_embedding=query_embedding, boost_cluster=query_cluster
+            )
+        elif use_cluster_filter:
             # 2. Buscar mais candidatos para filtrar
-            candidates = self.vectorizer.search_similar_documents(query, top_k * 10)
+            candidates = self.vectorizer.search_similar_documents(
+                query, top_k * 10, query_vector=query_embedding
+            )
             
             # 3. Filtrar por cluster e pegar melhores
             same_cluster = []
@@ -341,7 +406,9 @@ class MovieSearchGUI:
             return results[:top_k]
         else:
             # Re-ranking: aumentar score de filmes do mesmo cluster
-            candidates = self.vectorizer.search_similar_documents(query, top_k * 3)
+            candidates = self.vectorizer.search_similar_documents(
+                query, top_k * 3, query_vector=query_embedding
+            )
             
             reranked = []
             for idx, sim in candidates:
@@ -371,7 +438,7 @@ class MovieSearchGUI:
 
             prompt = prompts.get(search_type, search_text)
             
-            response = self.gemini_model.generate_content(prompt)
+            response = self._get_gemini_model().generate_content(prompt)
             refined_text = response.text.strip()
             print(f"\u2713 Query refinada por Gemini: '{refined_text}'")
             return refined_text
@@ -422,8 +489,11 @@ class MovieSearchGUI:
                 if self.knn_classifier is not None and self.use_knn_var.get():
                     print("Usando busca com KNN para melhor precisão...")
                     self.search_results = self.search_with_knn_boost(
-                        refined_search_text, top_k, use_cluster_filter=True
+                        refined_search_text, top_k, use_cluster_filter=True,
+                        use_mmr=self.use_mmr_var.get(),
                     )
+                elif self.use_mmr_var.get():
+                    self.search_results = self.search_with_mmr(refined_search_text, top_k)
                 else:
                     if self.knn_classifier is None:
                         print("KNN não disponível, usando busca padrão...")
@@ -467,8 +537,10 @@ class MovieSearchGUI:
             no_results.pack(pady=20)
             return
 
-        for rank, (idx, similarity) in enumerate(self.search_results, 1):
-            movie_data = self.df.iloc[idx]
+        # Metadados de todos os resultados em uma indexação vetorial (sem df.iloc por card)
+        indices = [idx for idx, _ in self.search_results]
+        cards = self.recommender.metadata.records(indices)
+        for rank, ((idx, similarity), movie_data) in enumerate(zip(self.search_results, cards), 1):
             self.create_movie_card(rank, idx, movie_data, similarity)
 
         self.info_label.config(text=f"Encontrados {len(self.search_results)} filmes")
@@ -525,7 +597,7 @@ class MovieSearchGUI:
         )
         streaming_label.pack(anchor=tk.W, pady=(2, 5))
 
-        synopsis_text = str(movie_data.get("synopsis_content", "N/A"))[:120] + "..."
+        synopsis_text = movie_data.get("synopsis_120", "N/A")
         synopsis_label = ttk.Label(
             middle_frame,
             text=f"Sinopse: {synopsis_text}",
@@ -549,7 +621,7 @@ class MovieSearchGUI:
         sim_label.pack(pady=(0, 10))
 
         link = movie_data.get("link", None)
-        if link:
+        if link and link != "N/A":
             visit_button = tk.Button(
                 right_frame,
                 text="Visitar Site",
@@ -572,7 +644,7 @@ class MovieSearchGUI:
             padx=10,
             pady=5,
             cursor="hand2",
-            command=lambda: self.show_movie_details(idx, movie_data),
+            command=lambda: self.show_movie_details(idx, self.df.iloc[idx]),
         )
         details_button.pack(pady=(5, 0))
 
@@ -638,7 +710,7 @@ Sinopse Completa:
         button_frame.pack(fill=tk.X, pady=(10, 0))
 
         link = movie_data.get("link", None)
-        if link:
+        if link and link != "N/A":
             visit_button = tk.Button(
                 button_frame,
                 text="Visitar Site do Filme",
@@ -0,0 +1,126 @@
+"""Similaridade de cosseno em blocos de linhas, com memória limitada.
+
+Funciona com matrizes densas (incluindo np.memmap) e esparsas (CSR). Cada
+bloco de linhas é multiplicado pela matriz inteira, reduzido (top-k ou
+limiar) e descartado, então a matriz n x n nunca é materializada.
+"""
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy import sparse
+
+from vectorizer import top_k_indices
+
+
+def _prepare(matrix, normalized):
+    # Linhas com norma 1 (cosseno = produto interno); denso sempre em float32
+    if sparse.issparse(matrix):
+        matrix = matrix.tocsr().astype(np.float32)
+        if not normalized:
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+            norms[norms == 0] = 1.0
+            matrix = sparse.diags(1.0 / norms).astype(np.float32) @ matrix
+        return matrix.tocsr()
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if not normalized:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+    return matrix
+
+
+def _block_rows(n_cols, memory_budget_mb, n_jobs):
+    # Cada thread mantém um bloco denso (linhas x n_cols) e uma cópia temporária
+    budget = memory_budget_mb * 1024 * 1024 // max(n_jobs, 1)
+    return max(1, budget // (n_cols * 4 * 2))
+
+
+def _map_blocks(x, y, reduce_block, memory_budget_mb, n_jobs):
+    """Aplica `reduce_block(start, scores)` em cada bloco de linhas, em ordem."""
+    block_rows = _block_rows(y.shape[0], memory_budget_mb, n_jobs)
+    y_t = y.T.tocsr() if sparse.issparse(y) else y.T
+
+    def run(start):
+        scores = x[start:start + block_rows] @ y_t
+        scores = scores.toarray() if sparse.issparse(scores) else scores
+        return reduce_block(start, np.asarray(scores, dtype=np.float32))
+
+    starts = range(0, x.shape[0], block_rows)
+    if n_jobs <= 1:
+        return [run(start) for start in starts]
+    # O produto de matrizes libera o GIL, então threads paralelizam os blocos
+    with ThreadPoolExecutor(n_jobs) as executor:
+        return list(executor.map(run, starts))
+
+
+def top_k_per_row(x, k, y=None, normalized=False, memory_budget_mb=512, n_jobs=1):
+    """
+    Os k vizinhos mais similares de cada linha de `x` (entre as linhas de `y`).
+
+    Args:
+        x: Matriz densa ou CSR (n, d)
+        k: Vizinhos por linha
+        y: Matriz de referência; se None, usa `x` e ignora a própria linha
+        normalized: Se as linhas já têm norma 1 (ex.: embeddings SBERT)
+        memory_budget_mb: Memória aproximada para os blocos de scores
+        n_jobs: Threads processando blocos em paralelo
+
+    Returns:
+        Tupla (indices, scores), ambos com shape (n, k)
+    """
+    exclude_self = y is None
+    x = _prepare(x, normalized)
+    y = x if exclude_self else _prepare(y, normalized)
+    k = min(k, y.shape[0] - 1 if exclude_self else y.shape[0])
+
+    def reduce_block(start, scores):
+        if exclude_self:
+            rows = np.arange(len(scores))
+            scores[rows, start + rows] = -np.inf
+        top = top_k_indices(scores, k)
+        return top, np.take_along_axis(scores, top, axis=1)
+
+    results = _map_blocks(x, y, reduce_block, memory_budget_mb, n_jobs)
+    if not results:
+        return np.empty((0, k), dtype=np.int64), np.empty((0, k), dtype=np.float32)
+    return np.vstack([top for top, _ in results]), np.vstack([scores for _, scores in results])
+
+
+def threshold_pairs(x, threshold, y=None, normalized=False, memory_budget_mb=512, n_jobs=1):
+    """
+    Todos os pares com similaridade >= `threshold`.
+
+    Returns:
+        scipy.sparse.csr_matrix (n_x, n_y) apenas com os pares acima do limiar
+        (sem a diagonal quando `y` é None)
+    """
+    exclude_self = y is None
+    x = _prepare(x, normalized)
+    y = x if exclude_self else _prepare(y, normalized)
+
+    def reduce_block(start, scores):
+        if exclude_self:
+            rows = np.arange(len(scores))
+            scores[rows, start + rows] = -np.inf
+        rows, cols = np.nonzero(scores >= threshold)
+        return rows + start, cols, scores[rows, cols]
+
+    results = _map_blocks(x, y, reduce_block, memory_budget_mb, n_jobs)
+    rows = np.concatenate([r for r, _, _ in results]) if results else np.empty(0, dtype=np.int64)
+    cols = np.concatenate([c for _, c, _ in results]) if results else np.empty(0, dtype=np.int64)
+    values = np.concatenate([v for _, _, v in results]) if results else np.empty(0, dtype=np.float32)
+    return sparse.csr_matrix((values, (rows, cols)), shape=(x.shape[0], y.shape[0]))
+
+
+def similarity_matrix(x, y=None, normalized=False, memory_budget_mb=512, n_jobs=1):
+    """Matriz densa de similaridade (float32), preenchida bloco a bloco."""
+    x = _prepare(x, normalized)
+    y = x if y is None else _prepare(y, normalized)
+    out = np.empty((x.shape[0], y.shape[0]), dtype=np.float32)
+
+    def reduce_block(start, scores):
+        out[start:start + len(scores)] = scores
+
+    _map_blocks(x, y, reduce_block, memory_budget_mb, n_jobs)
+    return out
@@ -0,0 +1,82 @@
+"""Pré-processamento das sinopses: limpeza, stopwords, lematização e stemming.
+
+Usado pelo get_movies_info (ao montar o movies_info.csv) e pela busca lexical
+(BM25), que precisa processar as queries do mesmo jeito que as sinopses. As
+stopwords e o stemmer são carregados uma única vez por processo.
+"""
+
+import string
+
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.stem import RSLPStemmer
+from nltk.stem import WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+
+_PUNCTUATION = str.maketrans('', '', string.punctuation)
+_stop_words = None
+_stemmer = None
+
+
+def stop_words() -> set:
+    """Stopwords em português (lidas do NLTK na primeira chamada)."""
+    global _stop_words
+    if _stop_words is None:
+        _stop_words = set(stopwords.words('portuguese'))
+    return _stop_words
+
+
+def clean_synopis(sinopse):
+    # Verificar se a sinopse não é None ou vazia
+    if not sinopse or pd.isna(sinopse):
+        return ""
+
+    # Converter para minúsculas
+    sinopse = sinopse.lower()
+
+    # Remover pontuações
+    sinopse = sinopse.translate(_PUNCTUATION)
+
+    # Tokenizar (dividir em palavras)
+    palavras = word_tokenize(sinopse, language='portuguese')
+
+    # Remover stopwords em português
+    palavras_excluidas = stop_words()
+    palavras_filtradas = [palavra for palavra in palavras if palavra not in palavras_excluidas]
+
+    return palavras_filtradas
+
+
+def lemma(palavras_filtradas: list[str]) -> list:
+    """
+    Feito o processo de lematização.
+
+    Args:
+        palavras_filtradas (list[str]): palavras com a remoção dos stopwords e pontuação.
+    """
+    lemmatizer = WordNetLemmatizer()
+
+    lemmas = [lemmatizer.lemmatize(palavra) for palavra in palavras_filtradas]
+
+    palavras_finais = [
+        palavra for palavra in lemmas
+        if len(palavra) > 2 and palavra.isalpha()  # só letras
+    ]
+
+    return palavras_finais
+
+
+def stemming(palavras_filtradas: list[str]) -> list:
+    """
+    Feito o processo de stematização.
+
+    Args:
+        palavras_filtradas (list[str]): palavras com a remoção dos stopwords e pontuação.
+    """
+    global _stemmer
+    if _stemmer is None:
+        _stemmer = RSLPStemmer()
+
+    palavras_stemmed = [_stemmer.stem(palavra) for palavra in palavras_filtradas]
+
+    return palavras_stemmed
@@ -1,76 +1,502 @@
-"""Vectorizador simples para análise de filmes."""
+"""Vectorizador simples para análise de filmes.
 
+sentence_transformers (torch), sklearn e pandas são importados apenas no
+primeiro uso, para que scripts que só leem vetores prontos iniciem rápido.
+"""
+
+import json
 import numpy as np
-import pandas as pd
 from pathlib import Path
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
+from scipy import sparse
+
+from embedding_cache import QueryEmbeddingCache
+from embedding_store import open_embedding_store, save_embedding_store
+
+SBERT_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+def build_enriched_texts(df):
+    """Combina sinopse e gêneros (repetidos para dar mais peso) em um texto por filme."""
+    enriched_texts = []
+    for synopsis, genres in zip(df["synopsis_content"], df["genres"]):
+        synopsis = str(synopsis).strip()
+        genres = str(genres).strip()
+        enriched_texts.append(f"{synopsis}. Gêneros: {genres}. {genres}.")
+    return enriched_texts
+
+
+def top_k_indices(scores, top_k):
+    """
+    Índices dos `top_k` maiores valores (ao longo do último eixo), em ordem decrescente.
+
+    Usa seleção parcial (argpartition, O(n)) e ordena apenas os k escolhidos.
+    """
+    n = scores.shape[-1]
+    if top_k >= n:
+        return np.argsort(-scores, axis=-1, kind="stable")
+    
+    candidates = np.argpartition(scores, n - top_k, axis=-1)[..., n - top_k:]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1)
+
 
 class Vectorizer:
-    def __init__(self):
+    def __init__(self, query_cache_size=1024, query_cache_ttl=3600):
         self.sbert_model = None
         self.bow_matrix = None
         self.tfidf_matrix = None
         self.sbert_embeddings = None
         self.bow_features = None
         self.tfidf_features = None
+        self.bow_vectorizer = None
+        self.tfidf_vectorizer = None
+        self.ann_index = None
+        self.encoding_stats = None
+        self.doc_ids = None
+        self._id_rows = {}
+        # Contadores de alterações incrementais: `revision` muda a cada
+        # add/update/remove_documents; `rewrite_revision` guarda a última que
+        # alterou ou renumerou linhas existentes (update/remove)
+        self.revision = 0
+        self.rewrite_revision = 0
+        self.query_cache = QueryEmbeddingCache(query_cache_size, query_cache_ttl)
     
     def create_bow_vectors(self, corpus):
+        from sklearn.feature_extraction.text import CountVectorizer
+        
         text_corpus = [" ".join(doc) if isinstance(doc, list) else doc for doc in corpus]
-        vectorizer = CountVectorizer(lowercase=True, min_df=2, max_df=0.95)
-        self.bow_matrix = vectorizer.fit_transform(text_corpus)
-        self.bow_features = vectorizer.get_feature_names_out()
+        self.bow_vectorizer = CountVectorizer(lowercase=True, min_df=2, max_df=0.95)
+        self.bow_matrix = self.bow_vectorizer.fit_transform(text_corpus)
+        self.bow_features = self.bow_vectorizer.get_feature_names_out()
         return self.bow_matrix, self.bow_features
     
     def create_tfidf_vectors(self, corpus):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        
         text_corpus = [" ".join(doc) if isinstance(doc, list) else doc for doc in corpus]
-        vectorizer = TfidfVectorizer(lowercase=True, min_df=2, max_df=0.95)
-        self.tfidf_matrix = vectorizer.fit_transform(text_corpus)
-        self.tfidf_features = vectorizer.get_feature_names_out()
+        self.tfidf_vectorizer = TfidfVectorizer(lowercase=True, min_df=2, max_df=0.95)
+        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(text_corpus)
+        self.tfidf_features = self.tfidf_vectorizer.get_feature_names_out()
         return self.tfidf_matrix, self.tfidf_features
     
-    def create_sbert_embeddings(self, corpus):
+    def fit_sparse(self, corpus):
+        # Tokeniza e conta uma única vez; o TF-IDF é derivado da mesma matriz de contagens
+        from sklearn.feature_extraction.text import TfidfTransformer
+        
+        self.create_bow_vectors(corpus)
+        transformer = TfidfTransformer()
+        self.tfidf_matrix = transformer.fit_transform(self.bow_matrix)
+        self.tfidf_features = self.bow_features
+        self.tfidf_vectorizer = _frozen_tfidf_vectorizer(self.tfidf_features, transformer.idf_)
+        return self.bow_matrix, self.tfidf_matrix
+    
+    def get_sbert_model(self):
         if self.sbert_model is None:
-            self.sbert_model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+            from sentence_transformers import SentenceTransformer
+            
+            self.sbert_model = SentenceTransformer(SBERT_MODEL_NAME)
+        return self.sbert_model
+    
+    def _encode_corpus(self, texts, batch_size, chunk_size, n_workers, out=None):
+        from sbert_encoder import SbertEncoder
+        
+        # Com vários processos cada um carrega o modelo; aqui só reaproveita o já carregado
+        model = self.get_sbert_model() if n_workers <= 1 else self.sbert_model
+        encoder = SbertEncoder(
+            batch_size=batch_size, chunk_size=chunk_size, n_workers=n_workers, model=model
+        )
+        embeddings = encoder.encode(texts, out=out)
+        self.encoding_stats = encoder.stats
+        return embeddings
+    
+    def _embed_texts(self, text_corpus, cache=None, batch_size=32, chunk_size=1024, n_workers=1):
+        if cache is None:
+            return self._encode_corpus(text_corpus, batch_size, chunk_size, n_workers)
         
+        # Só codifica os textos que não estão no cache (novos ou alterados)
+        embeddings, missing = cache.get_many(SBERT_MODEL_NAME, text_corpus)
+        if missing:
+            missing_texts = [text_corpus[i] for i in missing]
+            encoded = self._encode_corpus(missing_texts, batch_size, chunk_size, n_workers)
+            cache.put_many(SBERT_MODEL_NAME, missing_texts, encoded)
+            if embeddings is None:
+                embeddings = np.empty((len(text_corpus), encoded.shape[1]), dtype=np.float32)
+            embeddings[missing] = encoded
+        cache.save()
+        return embeddings
+    
+    def create_sbert_embeddings(self, corpus, cache=None, batch_size=32, chunk_size=1024, n_workers=1, out=None):
         text_corpus = [" ".join(doc) if isinstance(doc, list) else doc for doc in corpus]
-        self.sbert_embeddings = self.sbert_model.encode(text_corpus, normalize_embeddings=True)
+        if cache is None:
+            self.sbert_embeddings = self._encode_corpus(text_corpus, batch_size, chunk_size, n_workers, out)
+            return self.sbert_embeddings
+        
+        embeddings = self._embed_texts(text_corpus, cache, batch_size, chunk_size, n_workers)
+        if out is not None:
+            out[:] = embeddings
+            embeddings = out
+        self.sbert_embeddings = embeddings
         return self.sbert_embeddings
     
-    def calculate_similarity_matrix(self, method="sbert"):
-        if method == "bow" and self.bow_matrix is not None:
-            return cosine_similarity(self.bow_matrix)
-        elif method == "tfidf" and self.tfidf_matrix is not None:
-            return cosine_similarity(self.tfidf_matrix)
-        elif method == "sbert" and self.sbert_embeddings is not None:
-            return cosine_similarity(self.sbert_embeddings)
-        else:
+    def _n_documents(self):
+        for matrix in (self.sbert_embeddings, self.bow_matrix, self.tfidf_matrix):
+            if matrix is not None:
+                return matrix.shape[0]
+        return 0
+    
+    def set_doc_ids(self, doc_ids):
+        doc_ids = list(doc_ids)
+        if len(doc_ids) != self._n_documents():
+            raise ValueError("Número de ids diferente do número de documentos")
+        if len(set(doc_ids)) != len(doc_ids):
+            raise ValueError("Ids de documentos repetidos")
+        self.doc_ids = doc_ids
+        self._id_rows = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+    
+    def row_of(self, doc_id):
+        if self.doc_ids is None:
+            self.set_doc_ids(range(self._n_documents()))
+        try:
+            return self._id_rows[doc_id]
+        except KeyError:
+            raise ValueError(f"Documento '{doc_id}' não encontrado")
+    
+    def _sparse_rows(self, texts):
+        # Vocabulário e IDF congelados: termos novos são ignorados até o próximo ajuste completo
+        bow_rows = tfidf_rows = None
+        if self.bow_matrix is not None:
+            if self.bow_vectorizer is None:
+                raise ValueError("Vetorizador BoW não disponível para atualização incremental")
+            bow_rows = self.bow_vectorizer.transform(texts)
+        if self.tfidf_matrix is not None:
+            if self.tfidf_vectorizer is None:
+                raise ValueError("Vetorizador TF-IDF não disponível para atualização incremental")
+            tfidf_rows = self.tfidf_vectorizer.transform(texts)
+        return bow_rows, tfidf_rows
+    
+    def add_documents(self, doc_ids, texts, enriched_texts=None, cache=None):
+        """
+        Acrescenta documentos sem reajustar os vetorizadores.
+        
+        `texts` alimenta BoW/TF-IDF e `enriched_texts` (padrão: `texts`) o SBERT.
+        O chamador deve acrescentar as mesmas linhas ao DataFrame de filmes.
+        """
+        doc_ids = list(doc_ids)
+        if self.doc_ids is None:
+            self.set_doc_ids(range(self._n_documents()))
+        if len(set(doc_ids)) != len(doc_ids) or any(doc_id in self._id_rows for doc_id in doc_ids):
+            raise ValueError("Ids de documentos repetidos ou já existentes")
+        
+        texts = [" ".join(doc) if isinstance(doc, list) else doc for doc in texts]
+        enriched_texts = texts if enriched_texts is None else list(enriched_texts)
+        
+        bow_rows, tfidf_rows = self._sparse_rows(texts)
+        if bow_rows is not None:
+            self.bow_matrix = sparse.vstack([self.bow_matrix, bow_rows], format="csr")
+        if tfidf_rows is not None:
+            self.tfidf_matrix = sparse.vstack([self.tfidf_matrix, tfidf_rows], format="csr")
+        if self.sbert_embeddings is not None:
+            new_embeddings = self._embed_texts(enriched_texts, cache)
+            self.sbert_embeddings = np.vstack([self.sbert_embeddings, new_embeddings.astype(self.sbert_embeddings.dtype)])
+        
+        for doc_id in doc_ids:
+            self._id_rows[doc_id] = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+        # O índice ANN é montado sobre as linhas antigas e precisa ser reconstruído
+        self.ann_index = None
+        self.revision += 1
+    
+    def update_documents(self, doc_ids, texts, enriched_texts=None, cache=None):
+        rows = np.array([self.row_of(doc_id) for doc_id in doc_ids], dtype=np.int64)
+        texts = [" ".join(doc) if isinstance(doc, list) else doc for doc in texts]
+        enriched_texts = texts if enriched_texts is None else list(enriched_texts)
+        
+        # Substitui as linhas em O(nnz): zera as antigas e soma as novas nas mesmas posições
+        bow_rows, tfidf_rows = self._sparse_rows(texts)
+        n_docs = self._n_documents()
+        if bow_rows is not None or tfidf_rows is not None:
+            keep = np.ones(n_docs)
+            keep[rows] = 0
+            placement = sparse.csr_matrix(
+                (np.ones(len(rows)), (rows, np.arange(len(rows)))), shape=(n_docs, len(rows))
+            )
+            if bow_rows is not None:
+                self.bow_matrix = _replace_rows(self.bow_matrix, keep, placement, bow_rows)
+            if tfidf_rows is not None:
+                self.tfidf_matrix = _replace_rows(self.tfidf_matrix, keep, placement, tfidf_rows)
+        
+        if self.sbert_embeddings is not None:
+            if not self.sbert_embeddings.flags.writeable:
+                self.sbert_embeddings = np.array(self.sbert_embeddings)
+            self.sbert_embeddings[rows] = self._embed_texts(enriched_texts, cache)
+        self.ann_index = None
+        self.revision += 1
+        self.rewrite_revision = self.revision
+    
+    def remove_documents(self, doc_ids):
+        rows = [self.row_of(doc_id) for doc_id in doc_ids]
+        keep = np.ones(self._n_documents(), dtype=bool)
+        keep[rows] = False
+        
+        if self.bow_matrix is not None:
+            self.bow_matrix = self.bow_matrix[keep]
+        if self.tfidf_matrix is not None:
+            self.tfidf_matrix = self.tfidf_matrix[keep]
+        if self.sbert_embeddings is not None:
+            self.sbert_embeddings = self.sbert_embeddings[keep]
+        
+        self.set_doc_ids([doc_id for doc_id, kept in zip(self.doc_ids, keep) if kept])
+        self.ann_index = None
+        self.revision += 1
+        self.rewrite_revision = self.revision
+    
+    def get_representation(self, method="sbert"):
+        matrix = {
+            "bow": self.bow_matrix,
+            "tfidf": self.tfidf_matrix,
+            "sbert": self.sbert_embeddings,
+        }.get(method)
+        if matrix is None:
             raise ValueError(f"Método '{method}' não disponível")
+        return matrix
+    
+    def calculate_similarity_matrix(self, method="sbert", top_k=None, threshold=None, memory_budget_mb=512, n_jobs=1):
+        # Calculada em blocos de linhas; com top_k ou threshold a matriz n x n não é montada
+        import similarity_engine
+        
+        matrix = self.get_representation(method)
+        options = {"normalized": method == "sbert", "memory_budget_mb": memory_budget_mb, "n_jobs": n_jobs}
+        if top_k is not None:
+            return similarity_engine.top_k_per_row(matrix, top_k, **options)
+        if threshold is not None:
+            return similarity_engine.threshold_pairs(matrix, threshold, **options)
+        return similarity_engine.similarity_matrix(matrix, **options)
     
-    def search_similar_documents(self, query, top_k=5):
+    def _sbert_scores(self, query_vectors, block_size=65536, candidates=None):
+        # Embeddings e queries já são normalizados: o produto interno é o cosseno
+        embeddings = self.sbert_embeddings
+        if candidates is not None:
+            # Pré-filtro: só as linhas candidatas são lidas e pontuadas
+            return query_vectors @ np.asarray(embeddings[candidates], dtype=np.float32).T
+        if embeddings.dtype == np.float32:
+            return query_vectors @ embeddings.T
+        
+        # float16 (armazenamento compacto): converte em blocos para limitar a memória
+        scores = np.empty((len(query_vectors), len(embeddings)), dtype=np.float32)
+        for start in range(0, len(embeddings), block_size):
+            block = np.asarray(embeddings[start:start + block_size], dtype=np.float32)
+            scores[:, start:start + block_size] = query_vectors @ block.T
+        return scores
+    
+    def similarity_rows(self, rows, method="sbert", candidates=None):
+        # Similaridade de alguns documentos com todos os outros (ou só com `candidates`),
+        # sem montar a matriz n x n
+        matrix = self.get_representation(method)
+        if candidates is not None and len(candidates) == 0:
+            return np.empty((len(rows), 0), dtype=np.float32)
+        if method == "sbert":
+            query_vectors = np.asarray(matrix[rows], dtype=np.float32)
+            return self._sbert_scores(query_vectors, candidates=candidates)
+        
+        from sklearn.metrics.pairwise import cosine_similarity
+        return cosine_similarity(matrix[rows], matrix if candidates is None else matrix[candidates])
+    
+    def similarity_row(self, row, method="sbert"):
+        return self.similarity_rows(np.array([row]), method)[0]
+    
+    def build_ann_index(self, kind="ivf", **params):
+        from ann_index import build_ann_index
+        
+        if self.sbert_embeddings is None:
+            raise ValueError("Embeddings SBERT não disponíveis")
+        self.ann_index = build_ann_index(self.sbert_embeddings, kind, **params)
+        return self.ann_index
+    
+    def _search_vectors(self, query_vectors, top_k, approximate, candidates=None):
+        # Retorna (indices, scores) com shape (n_queries, top_k)
+        if candidates is not None:
+            # Com pré-filtro a busca é exata sobre as candidatas (o índice ANN cobre o corpus todo)
+            candidates = np.asarray(candidates, dtype=np.int64)
+            scores = self._sbert_scores(query_vectors, candidates=candidates)
+            top_indices = top_k_indices(scores, top_k)
+            return candidates[top_indices], np.take_along_axis(scores, top_indices, axis=-1)
+        
+        if approximate:
+            if self.ann_index is None:
+                raise ValueError("Índice ANN não disponível. Chame build_ann_index() primeiro.")
+            return self.ann_index.search(query_vectors, top_k)
+        
+        scores = self._sbert_scores(query_vectors)
+        top_indices = top_k_indices(scores, top_k)
+        return top_indices, np.take_along_axis(scores, top_indices, axis=-1)
+    
+    def encode_queries(self, queries):
+        # Só as queries fora do cache passam pelo modelo (em um único lote, sem repetidas)
+        vectors = [self.query_cache.get(query) for query in queries]
+        pending = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                pending.setdefault(self.query_cache.normalize(queries[i]), []).append(i)
+        if pending:
+            encoded = self.get_sbert_model().encode(list(pending), normalize_embeddings=True)
+            for (text, positions), vector in zip(pending.items(), np.asarray(encoded, dtype=np.float32)):
+                self.query_cache.put(text, vector)
+                for i in positions:
+                    vectors[i] = vector
+        return np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+    
+    def encode_query(self, query):
+        return self.encode_queries([query])[0]
+    
+    def search_similar_documents(self, query, top_k=5, approximate=False, query_vector=None, candidates=None):
         if self.sbert_embeddings is None:
             raise ValueError("Embeddings SBERT não disponíveis")
         
-        query_vector = self.sbert_model.encode([query], normalize_embeddings=True)
-        similarities = cosine_similarity(query_vector, self.sbert_embeddings)[0]
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        if query_vector is None:
+            query_vector = self.encode_query(query)
+        query_vector = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+        indices, scores = self._search_vectors(query_vector, top_k, approximate, candidates)
+        
+        return [(int(idx), float(sim)) for idx, sim in zip(indices[0], scores[0]) if idx >= 0]
+    
+    def search_many(self, queries, top_k=5, batch_size=256, approximate=False, query_vectors=None, candidates=None):
+        if self.sbert_embeddings is None:
+            raise ValueError("Embeddings SBERT não disponíveis")
+        
+        if query_vectors is None:
+            query_vectors = self.encode_queries(list(queries))
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        
+        indices, scores = self.search_vectors(query_vectors, top_k, batch_size, approximate, candidates)
+        return [
+            [(int(idx), float(sim)) for idx, sim in zip(row_indices, row_scores) if idx >= 0]
+            for row_indices, row_scores in zip(indices, scores)
+        ]
+    
+    def search_vectors(self, query_vectors, top_k=5, batch_size=256, approximate=False, candidates=None):
+        # Versão colunar: arrays (n_queries, top_k), com -1/-inf onde não há resultado
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        top_k = min(top_k, self._n_documents() if candidates is None else len(candidates))
+        indices = np.full((len(query_vectors), top_k), -1, dtype=np.int64)
+        scores = np.full((len(query_vectors), top_k), -np.inf, dtype=np.float32)
+        
+        # Um GEMM por lote de queries, limitando a matriz de scores a batch_size x n
+        for start in range(0, len(query_vectors), batch_size):
+            block_indices, block_scores = self._search_vectors(
+                query_vectors[start:start + batch_size], top_k, approximate, candidates
+            )
+            indices[start:start + len(block_indices)] = block_indices
+            scores[start:start + len(block_scores)] = block_scores
         
-        return [(int(idx), float(similarities[idx])) for idx in top_indices]
+        return indices, scores
     
-    def save_vectors(self, output_dir):
+    def load_embeddings(self, path):
+        # Anexa os embeddings somente leitura, sem copiar para a memória do processo
+        path = Path(path)
+        if path.suffix == ".npy":
+            self.sbert_embeddings = np.load(path, mmap_mode="r")
+        else:
+            self.sbert_embeddings = open_embedding_store(path)
+        return self.sbert_embeddings
+    
+    def save_vectors(self, output_dir, embedding_dtype="float32", export_csv=False):
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
+        # Matrizes esparsas ficam em CSR (.npz), proporcionais ao número de não-zeros
         if self.bow_matrix is not None:
-            bow_df = pd.DataFrame.sparse.from_spmatrix(self.bow_matrix, columns=self.bow_features)
-            bow_df.to_csv(output_path / "bow_matrix.csv", index=False, sep=";")
+            sparse.save_npz(output_path / "bow_matrix.npz", self.bow_matrix.tocsr())
+            _save_vocabulary(output_path / "bow_vocabulary.json", self.bow_features)
+            if export_csv:
+                import pandas as pd
+                bow_df = pd.DataFrame.sparse.from_spmatrix(self.bow_matrix, columns=self.bow_features)
+                bow_df.to_csv(output_path / "bow_matrix.csv", index=False, sep=";")
         
         if self.tfidf_matrix is not None:
-            tfidf_df = pd.DataFrame.sparse.from_spmatrix(self.tfidf_matrix, columns=self.tfidf_features)
-            tfidf_df.to_csv(output_path / "tfidf_matrix.csv", index=False, sep=";")
+            sparse.save_npz(output_path / "tfidf_matrix.npz", self.tfidf_matrix.tocsr())
+            _save_vocabulary(output_path / "tfidf_vocabulary.json", self.tfidf_features)
+            if self.tfidf_vectorizer is not None:
+                np.save(output_path / "tfidf_idf.npy", self.tfidf_vectorizer.idf_)
+            if export_csv:
+                import pandas as pd
+                tfidf_df = pd.DataFrame.sparse.from_spmatrix(self.tfidf_matrix, columns=self.tfidf_features)
+                tfidf_df.to_csv(output_path / "tfidf_matrix.csv", index=False, sep=";")
+        
+        if self.doc_ids is not None:
+            with open(output_path / "doc_ids.json", "w", encoding="utf-8") as file:
+                json.dump(self.doc_ids, file, ensure_ascii=False)
         
         if self.sbert_embeddings is not None:
-            np.save(output_path / "sbert_embeddings.npy", self.sbert_embeddings)
-            sbert_df = pd.DataFrame(self.sbert_embeddings)
-            sbert_df.to_csv(output_path / "sbert_embeddings.csv", index=False, sep=";")
\ No newline at end of file
+            save_embedding_store(output_path / "sbert_embeddings.emb", self.sbert_embeddings, embedding_dtype)
+            # Um índice salvo antes de add/update/remove_documents não corresponde mais às linhas
+            from ann_index import remove_ann_index
+            remove_ann_index(output_path)
+            if self.ann_index is not None:
+                self.ann_index.save(output_path)
+            if export_csv:
+                import pandas as pd
+                sbert_df = pd.DataFrame(self.sbert_embeddings)
+                sbert_df.to_csv(output_path / "sbert_embeddings.csv", index=False, sep=";")
+    
+    def load_vectors(self, input_dir):
+        # Restaura o que foi salvo por save_vectors, sem reajustar os vetorizadores
+        from sklearn.feature_extraction.text import CountVectorizer
+        
+        input_path = Path(input_dir)
+        
+        if (input_path / "bow_matrix.npz").exists():
+            self.bow_matrix = sparse.load_npz(input_path / "bow_matrix.npz")
+            self.bow_features = _load_vocabulary(input_path / "bow_vocabulary.json")
+            self.bow_vectorizer = CountVectorizer(lowercase=True, vocabulary=self.bow_features)
+        
+        if (input_path / "tfidf_matrix.npz").exists():
+            self.tfidf_matrix = sparse.load_npz(input_path / "tfidf_matrix.npz")
+            self.tfidf_features = _load_vocabulary(input_path / "tfidf_vocabulary.json")
+            if (input_path / "tfidf_idf.npy").exists():
+                self.tfidf_vectorizer = _frozen_tfidf_vectorizer(
+                    self.tfidf_features, np.load(input_path / "tfidf_idf.npy")
+                )
+        
+        if (input_path / "sbert_embeddings.emb").exists():
+            self.load_embeddings(input_path / "sbert_embeddings.emb")
+        elif (input_path / "sbert_embeddings.npy").exists():
+            self.load_embeddings(input_path / "sbert_embeddings.npy")
+        
+        from ann_index import load_ann_index
+        self.ann_index = load_ann_index(input_path)
+        if self.ann_index is not None and len(self.ann_index) != self._n_documents():
+            self.ann_index = None
+        
+        if (input_path / "doc_ids.json").exists():
+            with open(input_path / "doc_ids.json", "r", encoding="utf-8") as file:
+                self.set_doc_ids(json.load(file))
+        
+        return self
+
+
+def _replace_rows(matrix, keep, placement, rows):
+    # Mantém o dtype original (ex.: contagens inteiras do BoW)
+    dtype = matrix.dtype
+    keep = sparse.diags(keep, dtype=dtype)
+    updated = keep @ matrix + placement.astype(dtype) @ rows.astype(dtype)
+    updated.eliminate_zeros()
+    return updated.tocsr()
+
+
+def _frozen_tfidf_vectorizer(vocabulary, idf):
+    # TfidfVectorizer pronto para transform, com vocabulário e IDF já ajustados
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    
+    vectorizer = TfidfVectorizer(lowercase=True, vocabulary=vocabulary)
+    vectorizer.idf_ = idf
+    return vectorizer
+
+
+def _save_vocabulary(path, features):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(list(features), file, ensure_ascii=False)
+
+
+def _load_vocabulary(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return np.array(json.load(file), dtype=object)
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Os módulos de src/ se importam pelo nome (ex.: `from fetcher import ...`)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
@@ -0,0 +1,73 @@
+"""Servidor HTTP local que serve páginas salvas, para testar o fetcher sem rede.
+
+Cada rota responde com uma sequência de respostas: a n-ésima requisição recebe
+o n-ésimo item (o último se repete). Os horários das requisições ficam
+registrados para conferir limite de taxa e esperas.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PAGES_DIR = Path(__file__).parent / "pages"
+
+
+def page(name):
+    """Conteúdo de uma página salva em tests/pages."""
+    return (PAGES_DIR / name).read_bytes()
+
+
+class StubServer:
+    def __init__(self, routes, delay=0.0):
+        """
+        Args:
+            routes: Dicionário caminho -> lista de respostas (status, corpo,
+                    cabeçalhos), ex.: {"/filme": [(503, b"", {"Retry-After": "1"}),
+                    (200, page("filme.html"), {})]}
+            delay: Tempo (s) de cada resposta, para simular um servidor lento;
+                   um dicionário caminho -> tempo define o tempo por rota
+        """
+        self.routes = routes
+        self.delay = delay
+        self.requests = {path: [] for path in routes}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    calls = stub.requests.setdefault(self.path, [])
+                    calls.append(time.monotonic())
+                    responses = stub.routes.get(self.path, [(404, b"", {})])
+                    status, body, headers = responses[min(len(calls), len(responses)) - 1]
+
+                delay = stub.delay.get(self.path, 0.0) if isinstance(stub.delay, dict) else stub.delay
+                time.sleep(delay)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def url(self, path):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
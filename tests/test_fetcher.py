@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pandas as pd
+
+from fetcher import fetch_pages
+from stub_server import StubServer, page
+
+OK = (200, b"ok", {})
+
+
+def fetch(urls, **options):
+    options.setdefault("backoff", 0.01)
+    options.setdefault("requests_per_host", 0)
+    return asyncio.run(fetch_pages(urls, lambda url, content: content, **options))
+
+
+def test_retries_temporary_failures():
+    routes = {"/instavel": [(503, b"", {}), (502, b"", {}), OK]}
+    with StubServer(routes) as server:
+        results, failures = fetch([server.url("/instavel")], retries=3)
+
+    assert results == [b"ok"]
+    assert failures == []
+    assert len(server.requests["/instavel"]) == 3
+
+
+def test_respects_retry_after():
+    routes = {"/limitado": [(429, b"", {"Retry-After": "1"}), OK]}
+    with StubServer(routes) as server:
+        results, failures = fetch([server.url("/limitado")], retries=1)
+
+    first, second = server.requests["/limitado"]
+    assert results == [b"ok"]
+    assert second - first >= 1.0
+
+
+def test_gives_up_and_reports_failures():
+    routes = {"/fora": [(500, b"", {})], "/inexistente": [(404, b"", {})], "/ok": [OK]}
+    with StubServer(routes) as server:
+        urls = [server.url("/fora"), server.url("/inexistente"), server.url("/ok")]
+        results, failures = fetch(urls, retries=2)
+
+    assert results == [None, None, b"ok"]
+    assert {(failure["link"], failure["error"]) for failure in failures} == {
+        (urls[0], "HTTP 500"),
+        (urls[1], "HTTP 404"),
+    }
+    # 404 não é temporário: sem novas tentativas
+    assert len(server.requests["/fora"]) == 3
+    assert len(server.requests["/inexistente"]) == 1
+
+
+def test_rate_limit_per_host():
+    routes = {f"/filme/{i}": [OK] for i in range(8)}
+    # As duas primeiras respostas terminam juntas: os links que esperavam um
+    # worker livre não podem sair em rajada
+    delays = {"/filme/0": 0.5, "/filme/1": 0.45}
+    with StubServer(routes, delay=delays) as server:
+        fetch([server.url(path) for path in routes], concurrency=2, requests_per_host=20)
+
+    times = sorted(t for calls in server.requests.values() for t in calls)
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert min(gaps) >= 0.04
+
+
+def test_retry_does_not_wait_for_the_whole_queue():
+    routes = {"/instavel": [(503, b"", {}), OK], **{f"/filme/{i}": [OK] for i in range(20)}}
+    with StubServer(routes) as server:
+        fetch([server.url(path) for path in routes], concurrency=2, requests_per_host=10)
+
+    first, retry = server.requests["/instavel"]
+    # 21 links a 10 req/s levam 2 s; a nova tentativa sai logo depois da espera
+    assert retry - first < 0.5
+
+
+def test_get_movies_info_writes_failures(tmp_path, monkeypatch):
+    import get_movies_info
+
+    # Limpeza/stemming do NLTK trocados por versões simples (sem os corpora baixados)
+    monkeypatch.setattr(get_movies_info, "clean_synopis", lambda text: text.lower().split())
+    monkeypatch.setattr(get_movies_info, "lemma", lambda words: words)
+    monkeypatch.setattr(get_movies_info, "stemming", lambda words: [word[:5] for word in words])
+
+    routes = {
+        "/filme/jogo": [(503, b"", {}), (200, page("filme.html"), {})],
+        "/filme/removido": [(404, b"", {})],
+        "/filme/vazio": [(200, b"<html><body></body></html>", {})],
+    }
+    with StubServer(routes) as server:
+        links_path = tmp_path / "movies_links.csv"
+        links_path.write_text("\n".join(server.url(path) for path in routes))
+        output_path = tmp_path / "movies_info.csv"
+        start = time.monotonic()
+        get_movies_info.get_movies_info(str(links_path), str(output_path), retries=2)
+        assert time.monotonic() - start < 10
+
+    movies = pd.read_csv(output_path, sep=";")
+    assert movies["title"].tolist() == ["O Jogo do Tabuleiro"]
+    assert movies["year"].tolist() == ["(2021)"]
+    assert movies["movie_duration"].tolist() == ["1h 42min"]
+
+    failures = pd.read_csv(tmp_path / "movies_info_failures.csv", sep=";")
+    assert sorted(failures["link"]) == sorted([server.url("/filme/removido"), server.url("/filme/vazio")])
+    assert "HTTP 404" in failures["error"].tolist()